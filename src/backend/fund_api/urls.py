@@ -5,7 +5,10 @@ URL configuration for fund_api project.
 from django.contrib import admin
 from django.urls import path, include
 
+from funds.views import get_metrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('funds.urls')),
+    path('metrics', get_metrics, name='metrics'),
 ]
@@ -4,9 +4,14 @@ Script to fetch and update mutual fund data from external APIs
 """
 import os
 import sys
+import json
+import argparse
+import hashlib
+import tempfile
 import django
 import requests
 import pandas as pd
+from collections import defaultdict
 from datetime import datetime, timedelta
 
 # Set up Django environment
@@ -14,94 +19,301 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'fund_api.settings')
 django.setup()
 
-from funds.models import Fund, FundReturn, DataProvider, FundCategory, AumCategory, RiskRating
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from funds.cache import get_data_version
+from funds.ingest_runs import describe, read_records, record_error, record_run, record_validation, stage, timed_iter
+from funds.materialized import refresh_materialized_data
+from funds.navstore import upsert_nav_points
+from funds.parsers import clean_records, iter_json_lines
+from funds.providers import fetch_all_providers, stream_provider_funds
+from funds.models import (
+    METRIC_FIELDS, Fund, FundReturn, FundChange, ChangeType, DataProvider, FundCategory, AumCategory, RiskRating
+)
+
+# Serve generated sample funds instead of calling provider APIs
+USE_SAMPLE_DATA = os.getenv('USE_SAMPLE_DATA', 'True') == 'True'
 
 def fetch_funds_from_api():
-    """Fetch mutual fund data from external API"""
+    """Fetch mutual fund data from all active providers concurrently"""
     try:
-        # Get active data provider
-        provider = DataProvider.objects.filter(is_active=True).first()
-        if not provider:
+        providers = list(DataProvider.objects.filter(is_active=True))
+        if not providers:
             print("No active data provider found")
             return None
-            
-        # In a real implementation, you would make API calls like:
-        # response = requests.get(
-        #     f"{provider.base_url}/funds",
-        #     headers={"Authorization": f"Bearer {provider.api_key}"}
-        # )
-        
-        # For development purposes, we'll create sample data
-        # This simulates data that would come from a real API
-        print("Fetching sample fund data...")
-        sample_funds = _create_sample_fund_data()
-        return sample_funds
-        
+
+        if USE_SAMPLE_DATA:
+            # For development purposes, we'll create sample data
+            # This simulates data that would come from a real API
+            print("Fetching sample fund data...")
+            return _create_sample_fund_data()
+
+        if len(providers) == 1:
+            # A single provider needs no merging, so its records are streamed straight through
+            print(f"Streaming from {providers[0].name}...")
+            return stream_provider_funds(providers[0])
+
+        print(f"Fetching from {len(providers)} providers...")
+        return fetch_all_providers(providers)
+
     except Exception as e:
         print(f"Error fetching fund data: {str(e)}")
+        record_error(f"Fetch failed: {e}")
         return None
 
-def update_database(funds_data):
-    """Update database with latest fund data"""
+# Number of rows written per bulk_create/bulk_update statement
+BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', '1000'))
+
+FUND_FIELDS = [
+    'scheme_name', 'amc', 'nav', 'category', 'sub_category', 'expense_ratio',
+    'aum', 'aum_category', 'risk_rating', 'inception_date', 'fund_manager',
+    'min_sip_amount', 'min_lumpsum', 'exit_load', 'standard_deviation',
+    'sharpe_ratio', 'treynor_ratio', 'beta', 'alpha', 'cagr', 'max_drawdown'
+]
+
+def _fund_defaults(fund_data):
+    """Map an incoming fund record onto Fund model fields"""
+    return {field: fund_data.get(field) for field in FUND_FIELDS}
+
+def _content_hash(fund_data):
+    """Stable hash of the fields and returns we store for a fund record"""
+    payload = _fund_defaults(fund_data)
+    payload['returns'] = fund_data.get('returns', {})
+    payload['nav_date'] = fund_data.get('nav_date')
+    payload['nav_history'] = fund_data.get('nav_history')
+    raw = json.dumps(payload, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def _chunks(items, size):
+    """Yield successive lists of at most size elements from any iterable"""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _upsert_chunk(records, as_of_date, batch_size, changes):
+    """Write the new and changed funds in records, skipping ones whose content hash matches"""
+    # Last record wins if a scheme appears more than once in the chunk
+    incoming = {fund_data['scheme_code']: fund_data for fund_data in records}
+    existing = {
+        scheme_code: (fund_id, content_hash)
+        for scheme_code, fund_id, content_hash in Fund.objects.filter(
+            scheme_code__in=list(incoming)
+        ).values_list('scheme_code', 'id', 'content_hash')
+    }
+
+    to_create = []
+    # Grouped by field list so metrics a record leaves out keep the values computed from NAV history
+    to_update = defaultdict(list)
+    with stage('transform'):
+        for scheme_code, fund_data in incoming.items():
+            content_hash = _content_hash(fund_data)
+            fund_id, stored_hash = existing.get(scheme_code, (None, None))
+            if stored_hash == content_hash:
+                continue
+
+            fund = Fund(
+                id=fund_id, scheme_code=scheme_code, content_hash=content_hash,
+                **_fund_defaults(fund_data)
+            )
+            if fund_id is None:
+                to_create.append(fund)
+                changes.append((scheme_code, ChangeType.ADDED))
+            else:
+                fields = tuple(
+                    field for field in FUND_FIELDS if field not in METRIC_FIELDS or field in fund_data
+                )
+                to_update[fields].append(fund)
+                changes.append((scheme_code, ChangeType.MODIFIED))
+
+    Fund.objects.bulk_create(to_create, batch_size=batch_size)
+    updated = []
+    for fields, funds in to_update.items():
+        Fund.objects.bulk_update(funds, list(fields) + ['content_hash'], batch_size=batch_size)
+        updated.extend(funds)
+
+    # Only changed funds need their returns rewritten
+    changed_codes = [fund.scheme_code for fund in to_create + updated]
+    fund_ids = dict(
+        Fund.objects.filter(scheme_code__in=changed_codes).values_list('scheme_code', 'id')
+    )
+    existing_returns = {
+        (fund_return.fund_id, fund_return.period): fund_return
+        for fund_return in FundReturn.objects.filter(fund_id__in=list(fund_ids.values()))
+    }
+
+    returns_to_create = []
+    returns_to_update = []
+    for scheme_code in changed_codes:
+        fund_id = fund_ids[scheme_code]
+        for period, value in incoming[scheme_code].get('returns', {}).items():
+            fund_return = existing_returns.get((fund_id, period))
+            if fund_return is None:
+                returns_to_create.append(FundReturn(
+                    fund_id=fund_id,
+                    period=period,
+                    value=value,
+                    as_of_date=as_of_date
+                ))
+            else:
+                fund_return.value = value
+                fund_return.as_of_date = as_of_date
+                returns_to_update.append(fund_return)
+
+    FundReturn.objects.bulk_create(returns_to_create, batch_size=batch_size)
+    FundReturn.objects.bulk_update(
+        returns_to_update, ['value', 'as_of_date'], batch_size=batch_size
+    )
+
+    # Record the latest NAV, plus any history the source sent, as NAV time-series points
+    nav_points = []
+    for scheme_code in changed_codes:
+        fund_id = fund_ids[scheme_code]
+        fund_data = incoming[scheme_code]
+        for point in fund_data.get('nav_history') or []:
+            nav_points.append((fund_id, point['date'], point['nav']))
+        nav_points.append((fund_id, fund_data.get('nav_date') or as_of_date, fund_data['nav']))
+    navs_written = upsert_nav_points(nav_points, batch_size)
+
+    return {
+        'funds_created': len(to_create),
+        'funds_updated': len(updated),
+        'funds_unchanged': len(incoming) - len(to_create) - len(updated),
+        'returns_updated': len(returns_to_create) + len(returns_to_update),
+        'nav_points': navs_written,
+    }
+
+def _spool_records(records):
+    """
+    Read a streamed source into a temporary JSON Lines file, so the download or file read
+    happens before the write transaction opens and no locks are held across it.
+    Returns the file, positioned at the start, and the number of records.
+    """
+    spool = tempfile.TemporaryFile(mode='w+', encoding='utf-8')
+    count = 0
+    try:
+        with stage('fetch'):
+            for record in records:
+                spool.write(json.dumps(record, default=str, separators=(',', ':')))
+                spool.write('\n')
+                count += 1
+            spool.seek(0)
+    except BaseException:
+        spool.close()
+        raise
+    return spool, count
+
+def update_database(funds_data, batch_size=None, progress=None, detect_removed=True):
+    """
+    Update database with latest fund data using batched upserts.
+    funds_data may be any iterable of records, including a generator; a generator is
+    first spooled to a temporary file, then records are validated and written in chunks
+    of batch_size. Funds whose content hash is unchanged are skipped. progress, if given,
+    is called with (processed, total) after each chunk. Pass detect_removed=False for
+    partial loads such as backfills.
+    Returns a summary of the counts and the change log, or False on failure.
+    """
     if not funds_data:
         return False
-        
+
+    batch_size = batch_size or BATCH_SIZE
+    total = len(funds_data) if hasattr(funds_data, '__len__') else None
+
+    spool = None
+    if total is None:
+        try:
+            spool, total = _spool_records(read_records(funds_data))
+        except Exception as e:
+            print(f"Error fetching fund data: {str(e)}")
+            record_error(f"Fetch failed: {e}")
+            return False
+        records = iter_json_lines(spool)
+    else:
+        records = read_records(funds_data)
+
     try:
-        funds_updated = 0
-        funds_created = 0
-        returns_updated = 0
-        
-        for fund_data in funds_data:
-            # Get or create fund
-            fund, created = Fund.objects.update_or_create(
-                scheme_code=fund_data['scheme_code'],
-                defaults={
-                    'scheme_name': fund_data['scheme_name'],
-                    'amc': fund_data['amc'],
-                    'nav': fund_data['nav'],
-                    'category': fund_data['category'],
-                    'sub_category': fund_data.get('sub_category'),
-                    'expense_ratio': fund_data['expense_ratio'],
-                    'aum': fund_data['aum'],
-                    'aum_category': fund_data['aum_category'],
-                    'risk_rating': fund_data['risk_rating'],
-                    'inception_date': fund_data['inception_date'],
-                    'fund_manager': fund_data.get('fund_manager'),
-                    'min_sip_amount': fund_data.get('min_sip_amount'),
-                    'min_lumpsum': fund_data.get('min_lumpsum'),
-                    'exit_load': fund_data.get('exit_load'),
-                    'standard_deviation': fund_data.get('standard_deviation'),
-                    'sharpe_ratio': fund_data.get('sharpe_ratio'),
-                    'treynor_ratio': fund_data.get('treynor_ratio'),
-                    'beta': fund_data.get('beta'),
-                    'alpha': fund_data.get('alpha'),
-                    'cagr': fund_data.get('cagr'),
-                    'max_drawdown': fund_data.get('max_drawdown')
-                }
-            )
-            
-            if created:
-                funds_created += 1
+        as_of_date = datetime.now().date()
+        summary = {
+            'funds_created': 0,
+            'funds_updated': 0,
+            'funds_unchanged': 0,
+            'returns_updated': 0,
+            'nav_points': 0,
+        }
+        changes = []
+        seen_codes = set()
+
+        validation = {'invalid': 0}
+        records_iter = timed_iter('transform', clean_records(records, validation))
+
+        with transaction.atomic():
+            for records in _chunks(records_iter, batch_size):
+                seen_codes.update(fund_data['scheme_code'] for fund_data in records)
+                with stage('write'):
+                    chunk_summary = _upsert_chunk(records, as_of_date, batch_size, changes)
+                for key, count in chunk_summary.items():
+                    summary[key] += count
+                if progress:
+                    progress(len(seen_codes), total)
+            record_validation(validation)
+
+            if not seen_codes:
+                print("No valid fund records to update")
+                record_error("No valid fund records")
+                return False
+
+            # Schemes missing from the feed are logged once, not deleted, so a partial feed cannot wipe data
+            with stage('finalize'):
+                last_change = FundChange.objects.filter(
+                    scheme_code=OuterRef('scheme_code')
+                ).order_by('-id').values('change_type')[:1]
+                removal_candidates = Fund.objects.annotate(
+                    last_change=Subquery(last_change)
+                ).values_list('scheme_code', 'last_change').iterator() if detect_removed else []
+                for scheme_code, change_type in removal_candidates:
+                    if scheme_code not in seen_codes and change_type != ChangeType.REMOVED:
+                        changes.append((scheme_code, ChangeType.REMOVED))
+
+        with stage('finalize'):
+            if summary['funds_created'] or summary['funds_updated']:
+                # Rebuild derived tables and invalidate cached responses for the committed data
+                data_version = refresh_materialized_data()
             else:
-                funds_updated += 1
-                
-            # Update returns data
-            for period, value in fund_data['returns'].items():
-                fund_return, _ = FundReturn.objects.update_or_create(
-                    fund=fund,
-                    period=period,
-                    defaults={
-                        'value': value,
-                        'as_of_date': datetime.now().date()
-                    }
-                )
-                returns_updated += 1
-                
-        print(f"Database updated: {funds_created} funds created, {funds_updated} funds updated, {returns_updated} return entries")
-        return True
+                data_version = get_data_version()
+
+            FundChange.objects.bulk_create(
+                (
+                    FundChange(scheme_code=scheme_code, change_type=change_type, data_version=data_version)
+                    for scheme_code, change_type in changes
+                ),
+                batch_size=batch_size
+            )
+
+        summary['funds_removed'] = sum(
+            1 for _, change_type in changes if change_type == ChangeType.REMOVED
+        )
+        summary['records_invalid'] = validation['invalid']
+        summary['changes'] = changes
+        summary['data_version'] = data_version
+
+        print(
+            f"Database updated: {summary['funds_created']} funds created, "
+            f"{summary['funds_updated']} funds updated, {summary['funds_unchanged']} unchanged, "
+            f"{summary['funds_removed']} missing from feed, {summary['returns_updated']} return entries, "
+            f"{summary['records_invalid']} invalid records skipped"
+        )
+        return summary
     except Exception as e:
         print(f"Error updating database: {str(e)}")
+        record_error(f"Database update failed: {e}")
         return False
+    finally:
+        if spool is not None:
+            spool.close()
 
 def _create_sample_fund_data():
     """Create sample fund data for development"""
@@ -196,20 +408,43 @@ def _create_sample_fund_data():
     
     return sample_funds
 
-def main():
-    """Main function to fetch and update fund data"""
+def main(progress=None, refresh_job=None, profile=False):
+    """
+    Main function to fetch and update fund data; returns the update summary.
+    The run's timings and counts are recorded as an IngestRun, linked to refresh_job if given;
+    with profile, its stacks are also sampled for a flame graph.
+    """
+    with record_run('sample' if USE_SAMPLE_DATA else 'providers', refresh_job, profile) as recorder:
+        summary = _fetch_and_update(progress)
+        recorder.summary = summary
+    print(describe(recorder.run))
+    return summary
+
+def _fetch_and_update(progress):
     print("Fetching fund data...")
-    funds_data = fetch_funds_from_api()
+    with stage('fetch'):
+        funds_data = fetch_funds_from_api()
     
     if funds_data:
-        print(f"Fetched {len(funds_data)} funds. Updating database...")
-        success = update_database(funds_data)
-        if success:
+        if hasattr(funds_data, '__len__'):
+            print(f"Fetched {len(funds_data)} funds. Updating database...")
+        else:
+            print("Streaming fund data into database...")
+        summary = update_database(funds_data, progress=progress)
+        if summary:
             print("Database updated successfully")
         else:
             print("Failed to update database")
+        return summary
     else:
         print("No fund data fetched")
+        record_error("No fund data fetched")
+        return None
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--profile', action='store_true',
+        help='Sample the run and save a flame graph profile (collapsed stacks) to PROFILE_DIR'
+    )
+    main(profile=parser.parse_args().profile)
@@ -1,6 +1,6 @@
 
 from django.contrib import admin
-from .models import Fund, FundReturn, DataProvider
+from .models import Fund, FundReturn, DataProvider, FundChange, RefreshJob, BenchmarkNav, IngestRun
 
 @admin.register(Fund)
 class FundAdmin(admin.ModelAdmin):
@@ -16,6 +16,27 @@ class FundReturnAdmin(admin.ModelAdmin):
 
 @admin.register(DataProvider)
 class DataProviderAdmin(admin.ModelAdmin):
-    list_display = ('name', 'is_active', 'base_url')
+    list_display = ('name', 'is_active', 'priority', 'base_url')
     list_filter = ('is_active',)
     search_fields = ('name',)
+
+@admin.register(FundChange)
+class FundChangeAdmin(admin.ModelAdmin):
+    list_display = ('scheme_code', 'change_type', 'data_version', 'changed_at')
+    list_filter = ('change_type', 'data_version')
+    search_fields = ('scheme_code',)
+
+@admin.register(RefreshJob)
+class RefreshJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'status', 'funds_processed', 'funds_total', 'created_at', 'finished_at')
+    list_filter = ('status',)
+
+@admin.register(IngestRun)
+class IngestRunAdmin(admin.ModelAdmin):
+    list_display = ('id', 'source', 'status', 'started_at', 'duration_seconds', 'records_read', 'records_failed')
+    list_filter = ('status', 'source')
+
+@admin.register(BenchmarkNav)
+class BenchmarkNavAdmin(admin.ModelAdmin):
+    list_display = ('symbol', 'date', 'value')
+    list_filter = ('symbol',)
@@ -0,0 +1,191 @@
+
+import csv
+import logging
+import warnings
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+
+from .materialized import refresh_materialized_data
+from .models import METRIC_FIELDS, BenchmarkNav, Fund, FundNav
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS = 252
+
+WINDOWS = {'1Y': 1, '3Y': 3, '5Y': 5}
+
+# A fund needs NAVs on at least this share of the window's trading days
+MIN_COVERAGE = 0.6
+
+def load_nav_matrix(start, end, fund_ids=None):
+    """
+    Load NAVs between start and end as a dates x funds matrix.
+    Gaps of up to five days (holidays, missed uploads) are forward-filled.
+    """
+    rows = FundNav.objects.filter(date__gte=start, date__lte=end)
+    if fund_ids is not None:
+        rows = rows.filter(fund_id__in=fund_ids)
+    frame = pd.DataFrame.from_records(
+        rows.values_list('fund_id', 'date', 'nav').iterator(), columns=['fund_id', 'date', 'nav']
+    )
+    if frame.empty:
+        return pd.DataFrame()
+    frame['nav'] = frame['nav'].astype(np.float64)
+    matrix = frame.pivot(index='date', columns='fund_id', values='nav').sort_index()
+    matrix.index = pd.to_datetime(matrix.index)
+    return matrix.ffill(limit=5)
+
+def load_benchmark(symbol, start, end):
+    """Load a benchmark index series between start and end"""
+    rows = BenchmarkNav.objects.filter(symbol=symbol, date__gte=start, date__lte=end).values_list('date', 'value')
+    series = pd.Series(
+        {pd.Timestamp(row_date): float(value) for row_date, value in rows}, dtype=np.float64
+    )
+    return series.sort_index()
+
+def compute_metrics(navs, benchmark, risk_free_rate):
+    """
+    Compute risk metrics for every fund column of a NAV matrix at once.
+
+    navs is a dates x funds matrix, benchmark a series on (a superset of) the same dates
+    and risk_free_rate an annual rate in percent. Returns a funds x metrics frame in the
+    units stored on Fund: percentages for volatility, alpha, CAGR and drawdown.
+    """
+    benchmark = benchmark.reindex(navs.index).ffill()
+    returns = navs.pct_change(fill_method=None).iloc[1:]
+    bench_returns = benchmark.pct_change(fill_method=None).iloc[1:].to_numpy()
+
+    r = returns.to_numpy()
+    observations = (~np.isnan(r)).sum(axis=0)
+    rf_daily = risk_free_rate / 100 / TRADING_DAYS
+
+    # Regression statistics only use days where both the fund and the benchmark have a return
+    paired = ~np.isnan(r) & ~np.isnan(bench_returns)[:, None]
+    r_paired = np.where(paired, r, np.nan)
+    b_paired = np.where(paired, bench_returns[:, None], np.nan)
+    pairs = paired.sum(axis=0)
+
+    nav_values = navs.to_numpy()
+    has_nav = ~np.isnan(nav_values)
+    first_index = np.argmax(has_nav, axis=0)
+    last_index = len(nav_values) - 1 - np.argmax(has_nav[::-1], axis=0)
+    columns = np.arange(nav_values.shape[1])
+    day_numbers = (navs.index - navs.index[0]).days.to_numpy()
+
+    with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+        # All-NaN columns are expected for funds without history in the window
+        warnings.simplefilter('ignore', RuntimeWarning)
+
+        mean = np.nanmean(r, axis=0)
+        volatility = np.nanstd(r, axis=0, ddof=1) * np.sqrt(TRADING_DAYS)
+        annual_excess = (mean - rf_daily) * TRADING_DAYS
+        sharpe = annual_excess / volatility
+
+        r_centered = r_paired - np.nanmean(r_paired, axis=0)
+        b_centered = b_paired - np.nanmean(b_paired, axis=0)
+        covariance = np.nansum(r_centered * b_centered, axis=0) / (pairs - 1)
+        variance = np.nansum(b_centered ** 2, axis=0) / (pairs - 1)
+        beta = covariance / variance
+
+        fund_excess = (np.nanmean(r_paired, axis=0) - rf_daily) * TRADING_DAYS
+        bench_excess = (np.nanmean(b_paired, axis=0) - rf_daily) * TRADING_DAYS
+        alpha = fund_excess - beta * bench_excess
+        treynor = annual_excess / beta
+
+        first = nav_values[first_index, columns]
+        last = nav_values[last_index, columns]
+        days = day_numbers[last_index] - day_numbers[first_index]
+        cagr = np.where(days > 0, (last / first) ** (365.0 / days) - 1, np.nan)
+
+        running_peak = np.fmax.accumulate(nav_values, axis=0)
+        max_drawdown = np.nanmax(1 - nav_values / running_peak, axis=0)
+
+    metrics = pd.DataFrame({
+        'standard_deviation': volatility * 100,
+        'sharpe_ratio': sharpe,
+        'treynor_ratio': treynor,
+        'beta': beta,
+        'alpha': alpha * 100,
+        'cagr': cagr * 100,
+        'max_drawdown': max_drawdown * 100,
+    }, index=navs.columns)
+
+    # Funds with too little history in the window get no metrics
+    metrics.loc[observations < MIN_COVERAGE * len(returns)] = np.nan
+    return metrics
+
+def _to_decimal(value, max_digits):
+    """Round to two places, or None when missing or too large for the column"""
+    if value is None or not np.isfinite(value):
+        return None
+    value = round(float(value), 2)
+    if abs(value) >= 10 ** (max_digits - 2):
+        return None
+    return Decimal(str(value))
+
+def write_metrics(metrics, batch_size=1000):
+    """
+    Bulk-write a funds x metrics frame back onto Fund rows.
+    Only the metrics that were computed are written, so a fund short of history, or beta and
+    alpha without a benchmark, keep their current (e.g. provider) values instead of NULL.
+    Returns the number of funds updated.
+    """
+    max_digits = {field: Fund._meta.get_field(field).max_digits for field in METRIC_FIELDS}
+    # Grouped by the fields computed, one bulk_update per distinct set
+    to_update = defaultdict(list)
+    for fund_id, row in metrics.iterrows():
+        values = {field: _to_decimal(row[field], max_digits[field]) for field in METRIC_FIELDS}
+        values = {field: value for field, value in values.items() if value is not None}
+        if values:
+            to_update[tuple(values)].append(Fund(id=fund_id, **values))
+    with transaction.atomic():
+        for fields, funds in to_update.items():
+            Fund.objects.bulk_update(funds, list(fields), batch_size=batch_size)
+    return sum(len(funds) for funds in to_update.values())
+
+def recompute_fund_metrics(window='3Y', risk_free_rate=None, benchmark_symbol=None, as_of=None):
+    """
+    Recompute risk metrics for all funds with NAV history over the trailing window.
+    Returns the number of funds written.
+    """
+    risk_free_rate = settings.RISK_FREE_RATE if risk_free_rate is None else risk_free_rate
+    benchmark_symbol = benchmark_symbol or settings.BENCHMARK_SYMBOL
+    end = as_of or date.today()
+    start = (pd.Timestamp(end) - pd.DateOffset(years=WINDOWS[window])).date()
+
+    navs = load_nav_matrix(start, end)
+    if navs.empty:
+        logger.warning("No NAV history between %s and %s", start, end)
+        return 0
+
+    benchmark = load_benchmark(benchmark_symbol, start, end)
+    if benchmark.empty:
+        logger.warning("No %s benchmark data; beta, alpha and Treynor ratio will be empty", benchmark_symbol)
+        benchmark = pd.Series(np.nan, index=navs.index)
+
+    metrics = compute_metrics(navs, benchmark, risk_free_rate)
+    count = write_metrics(metrics)
+    refresh_materialized_data()
+    return count
+
+def load_benchmark_file(path, symbol):
+    """Upsert benchmark values from a CSV file with date and value columns"""
+    with open(path, newline='', encoding='utf-8') as handle:
+        rows = {
+            date.fromisoformat(row['date']): Decimal(row['value'])
+            for row in csv.DictReader(handle) if row.get('date') and row.get('value')
+        }
+    BenchmarkNav.objects.bulk_create(
+        [BenchmarkNav(symbol=symbol, date=row_date, value=value) for row_date, value in rows.items()],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['symbol', 'date'],
+        update_fields=['value'],
+    )
+    return len(rows)
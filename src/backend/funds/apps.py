@@ -1,7 +1,22 @@
 
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def ensure_search_index(sender, using, **kwargs):
+    from django.db import connections
+    from .search import ensure_search_index as ensure
+
+    # SQLite table rebuilds during migrations drop the FTS sync triggers
+    ensure(connections[using])
 
 
 class FundsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'funds'
+
+    def ready(self):
+        from .utils.db_utils import install_connection_tracking
+
+        post_migrate.connect(ensure_search_index, sender=self)
+        install_connection_tracking()
@@ -0,0 +1,113 @@
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.paginator import InvalidPage
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+
+from .cache import async_cached_response
+from .filters import filter_funds
+from .models import Fund, MetricSnapshot
+from .pagination import KeysetPagination, use_cursor_pagination
+from .snapshot import get_snapshot
+from .views import empty_metric_snapshot, metric_stats_data, top_funds_params
+from . import leaderboards, projection
+
+# Async counterparts of the read endpoints in views.py, enabled with ASYNC_READ_VIEWS.
+# They return the same bytes as the sync views and share their response cache entries.
+
+def _requested_fields(request):
+    return projection.parse_fields(request.query_params.get('fields')) or projection.FUND_FIELDS
+
+def _paginated(count, pagination, results):
+    return {
+        'count': count,
+        'next': pagination.get_next_link(),
+        'previous': pagination.get_previous_link(),
+        'results': results,
+    }
+
+async def _page(request, object_list):
+    """Select the page of object_list asked for, as the sync views' PageNumberPagination does"""
+    pagination = PageNumberPagination()
+    pagination.request = request
+    paginator = pagination.django_paginator_class(object_list, pagination.get_page_size(request))
+    # Counted here so the Paginator never queries synchronously
+    paginator.count = len(object_list) if isinstance(object_list, list) else await object_list.acount()
+    page_number = pagination.get_page_number(request, paginator)
+    try:
+        pagination.page = paginator.page(page_number)
+    except InvalidPage as exc:
+        raise NotFound(pagination.invalid_page_message.format(page_number=page_number, message=str(exc)))
+    return pagination
+
+async def _rows_by_id(fund_ids, fields):
+    """project_queryset rows for fund_ids, in the order given"""
+    queryset = projection.project_queryset(Fund.objects.filter(pk__in=fund_ids), fields)
+    rows = {row.id: row async for row in queryset}
+    return [rows[fund_id] for fund_id in fund_ids if fund_id in rows]
+
+@async_cached_response('funds-list')
+async def fund_list(request):
+    """Async FundViewSet.list"""
+    fields = _requested_fields(request)
+    if settings.FUND_SNAPSHOT_ENABLED and not use_cursor_pagination(request):
+        # Building a snapshot reads the whole fund table; done once per data version
+        snapshot = await sync_to_async(get_snapshot)()
+        fund_ids = snapshot.screen(request.query_params)
+        if fund_ids is not None:
+            pagination = await _page(request, fund_ids.tolist())
+            rows = await _rows_by_id(list(pagination.page.object_list), fields)
+            return _paginated(len(fund_ids), pagination, await projection.aproject_funds(rows, fields))
+
+    if request.query_params.get('searchQuery'):
+        # SQLite search probes its full-text index while building the queryset
+        queryset = await sync_to_async(filter_funds)(Fund.objects.all(), request.query_params)
+    else:
+        queryset = filter_funds(Fund.objects.all(), request.query_params)
+    queryset = projection.project_queryset(queryset, fields)
+    if use_cursor_pagination(request):
+        pagination = KeysetPagination()
+        rows = await pagination.apaginate_queryset(queryset, request)
+        return _paginated(pagination.count, pagination, await projection.aproject_funds(rows, fields))
+
+    pagination = await _page(request, queryset)
+    rows = [row async for row in pagination.page.object_list]
+    return _paginated(
+        pagination.page.paginator.count, pagination, await projection.aproject_funds(rows, fields)
+    )
+
+@async_cached_response('funds-detail')
+async def fund_detail(request, pk):
+    """Async FundViewSet.retrieve"""
+    fields = _requested_fields(request)
+    try:
+        row = await projection.project_queryset(Fund.objects.all(), fields).aget(pk=pk)
+    except Fund.DoesNotExist:
+        raise NotFound()
+    return (await projection.aproject_funds([row], fields))[0]
+
+@async_cached_response('top-funds')
+async def top_funds(request):
+    """Async get_top_performing_funds"""
+    metric, category, limit = top_funds_params(request.query_params)
+    fund_ids = [fund_id async for fund_id in leaderboards.top_fund_ids_query(metric, category, limit)]
+    rows = await _rows_by_id(fund_ids, projection.FUND_FIELDS)
+    return await projection.aproject_funds(rows, projection.FUND_FIELDS)
+
+@async_cached_response('amcs')
+async def all_amcs(request):
+    """Async get_all_amcs"""
+    return [amc async for amc in Fund.objects.values_list('amc', flat=True).distinct().order_by('amc')]
+
+@async_cached_response('metrics-stats')
+async def metrics_stats(request):
+    """Async get_advanced_metrics_stats"""
+    category = request.query_params.get('category', '')
+    sub_category = request.query_params.get('sub_category', '')
+    snapshot = await MetricSnapshot.objects.filter(category=category, sub_category=sub_category).afirst()
+    if snapshot is None:
+        if not await MetricSnapshot.objects.aexists():
+            return metric_stats_data(empty_metric_snapshot(category, sub_category))
+        raise NotFound("No statistics for this category")
+    return metric_stats_data(snapshot)
@@ -0,0 +1,2 @@
+
+# Database engines wrapping Django's own to time new connections
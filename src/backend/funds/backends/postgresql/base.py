@@ -0,0 +1,7 @@
+
+from django.db.backends.postgresql import base
+
+from funds.utils.db_utils import ConnectTimingMixin
+
+class DatabaseWrapper(ConnectTimingMixin, base.DatabaseWrapper):
+    """PostgreSQL backend that records connection times for the database health endpoint"""
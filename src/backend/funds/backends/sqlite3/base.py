@@ -0,0 +1,7 @@
+
+from django.db.backends.sqlite3 import base
+
+from funds.utils.db_utils import ConnectTimingMixin
+
+class DatabaseWrapper(ConnectTimingMixin, base.DatabaseWrapper):
+    """SQLite backend that records connection times for the database health endpoint"""
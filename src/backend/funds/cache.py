@@ -0,0 +1,208 @@
+
+from calendar import timegm
+from functools import wraps
+from hashlib import md5
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import condition
+from rest_framework.exceptions import APIException, MethodNotAllowed
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .metrics import timed
+from .models import DataVersion
+from .renderers import FastJSONRenderer
+
+DATA_VERSION_KEY = 'funds:data-stamp'
+
+def get_data_stamp():
+    """
+    Get the current fund data version and when it was last bumped.
+    The pair is read through the cache so most calls never reach the database.
+    """
+    stamp = cache.get(DATA_VERSION_KEY)
+    if stamp is None:
+        row = DataVersion.objects.filter(pk=1).values_list('version', 'updated_at').first()
+        stamp = row or (0, None)
+        cache.set(DATA_VERSION_KEY, stamp, settings.DATA_VERSION_TTL)
+    return stamp
+
+async def aget_data_stamp():
+    """get_data_stamp for async views"""
+    stamp = await cache.aget(DATA_VERSION_KEY)
+    if stamp is None:
+        row = await DataVersion.objects.filter(pk=1).values_list('version', 'updated_at').afirst()
+        stamp = row or (0, None)
+        await cache.aset(DATA_VERSION_KEY, stamp, settings.DATA_VERSION_TTL)
+    return stamp
+
+def get_data_version():
+    """Get the current fund data version"""
+    return get_data_stamp()[0]
+
+def bump_data_version():
+    """
+    Increment the data version, invalidating every cached response.
+    Call this after fund data has been committed.
+    """
+    updated = DataVersion.objects.filter(pk=1).update(
+        version=F('version') + 1, updated_at=timezone.now()
+    )
+    if not updated:
+        DataVersion.objects.create(pk=1, version=1)
+    cache.delete(DATA_VERSION_KEY)
+    return get_data_version()
+
+def _cache_key(version, prefix, request, kwargs):
+    params = sorted(
+        (key, value)
+        for key, values in request.GET.lists()
+        for value in values
+        if value != ''
+    )
+    params.extend(sorted(kwargs.items()))
+    raw = f"{request.get_host()}|{urlencode(params)}"
+    digest = md5(raw.encode('utf-8')).hexdigest()
+    return f"funds:v{version}:{prefix}:{digest}"
+
+def response_cache_key(prefix, request, **kwargs):
+    """Build a cache key from the view prefix, URL kwargs and normalized query parameters"""
+    return _cache_key(get_data_version(), prefix, request, kwargs)
+
+def _etag(key):
+    return md5(key.encode('utf-8')).hexdigest()
+
+def _etag_func(prefix):
+    def etag(request, *args, **kwargs):
+        # Strong ETags name one representation, so the negotiated media type is part of it
+        return _etag(response_cache_key(prefix, request, accept=request.META.get('HTTP_ACCEPT', ''), **kwargs))
+    return etag
+
+def _last_modified(request, *args, **kwargs):
+    return get_data_stamp()[1]
+
+def _patch_http_caching(response):
+    patch_cache_control(
+        response,
+        public=True,
+        max_age=settings.HTTP_CACHE_MAX_AGE,
+        s_maxage=settings.HTTP_CACHE_S_MAXAGE,
+        stale_while_revalidate=settings.HTTP_CACHE_STALE_WHILE_REVALIDATE,
+    )
+    patch_vary_headers(response, ['Accept'])
+
+def conditional_response(prefix):
+    """
+    Tag 200 responses with an ETag and Last-Modified derived from the data version, answer
+    matching If-None-Match/If-Modified-Since with 304 before the view runs, and add
+    Cache-Control headers that let a CDN serve the response until the next refresh.
+    Errors get none of these, so a client or CDN never revalidates an error into a 304.
+    """
+    def decorator(view_func):
+        conditional = condition(etag_func=_etag_func(prefix), last_modified_func=_last_modified)(view_func)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            response = conditional(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                _patch_http_caching(response)
+            else:
+                # condition() adds the validators whatever the status
+                for header in ('ETag', 'Last-Modified'):
+                    if response.has_header(header):
+                        del response.headers[header]
+            return response
+        return wrapper
+    return decorator
+
+def cached_response(prefix):
+    """
+    Cache the data of successful responses until the data version changes.
+    Responses are also conditional; see conditional_response.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            key = response_cache_key(prefix, request, **kwargs)
+            data = cache.get(key)
+            if data is not None:
+                return Response(data)
+
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, settings.CACHE_TIMEOUT)
+            return response
+        return conditional_response(prefix)(wrapper)
+    return decorator
+
+def async_cached_response(prefix):
+    """
+    cached_response for async views returning JSON-serializable data.
+    Shares cache entries with the sync views using the same prefix, answers conditional
+    requests the same way, and streams the rendered body; API errors are rendered as JSON.
+    """
+    renderer = FastJSONRenderer()
+
+    def error_response(exc):
+        detail = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+        return HttpResponse(renderer.render(detail), status=exc.status_code, content_type=renderer.media_type)
+
+    async def stream(data):
+        for chunk in renderer.stream(data, settings.ASYNC_STREAM_CHUNK_SIZE):
+            yield chunk
+
+    def decorator(view_func):
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return error_response(MethodNotAllowed(request.method))
+            request = Request(request)
+            version, updated_at = await aget_data_stamp()
+            # Always JSON, so the ETag matches the sync views' for Accept: application/json
+            etag = quote_etag(_etag(_cache_key(version, prefix, request, {'accept': renderer.media_type, **kwargs})))
+            last_modified = timegm(updated_at.utctimetuple()) if updated_at else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                key = _cache_key(version, prefix, request, kwargs)
+                data = await cache.aget(key)
+                if data is not None:
+                    with timed('render'):
+                        body = renderer.render(data)
+                    response = HttpResponse(body, content_type=renderer.media_type)
+                else:
+                    try:
+                        data = await view_func(request, *args, **kwargs)
+                    except APIException as exc:
+                        return error_response(exc)
+                    await cache.aset(key, data, settings.CACHE_TIMEOUT)
+                    response = StreamingHttpResponse(stream(data), content_type=renderer.media_type)
+
+            response.headers['ETag'] = etag
+            if last_modified is not None:
+                response.headers['Last-Modified'] = http_date(last_modified)
+            _patch_http_caching(response)
+            return response
+        return wrapper
+    return decorator
+
+class CachedResponseMixin:
+    """Cache list and retrieve responses of a read-only viewset"""
+    cache_prefix = None
+
+    def list(self, request, *args, **kwargs):
+        return cached_response(f"{self.cache_prefix}-list")(
+            super().list
+        )(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return cached_response(f"{self.cache_prefix}-detail")(
+            super().retrieve
+        )(request, *args, **kwargs)
@@ -0,0 +1,149 @@
+
+import re
+
+import numpy as np
+
+from .navstore import EPOCH
+
+DAYS_PER_YEAR = 365.0
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+WINDOW_PATTERN = re.compile(r'^(\d+)([DMY])$')
+
+def _days(value):
+    return int((np.datetime64(value, 'D') - EPOCH).astype(np.int64))
+
+def parse_window(value):
+    """Parse a window like 90D, 6M or 3Y into calendar days"""
+    match = WINDOW_PATTERN.match((value or '').strip().upper())
+    if not match:
+        raise ValueError("window must look like 90D, 6M or 3Y")
+    count, unit = int(match.group(1)), match.group(2)
+    days = {'D': count, 'M': round(count * DAYS_PER_YEAR / 12), 'Y': round(count * DAYS_PER_YEAR)}[unit]
+    if days <= 0:
+        raise ValueError("window must be positive")
+    return days
+
+def rolling_returns(log_series, window_days):
+    """
+    Returns in percent for every window of window_days that starts on a NAV date.
+    Each window ends on the first NAV on or after start + window_days; windows of a
+    year or more are annualized (CAGR), shorter ones are absolute returns.
+    Returns (start_days, values).
+    """
+    days = log_series[:, 0]
+    log_nav = log_series[:, 1]
+    end = np.searchsorted(days, days + window_days, side='left')
+    valid = end < len(days)
+    start = np.flatnonzero(valid)
+    end = end[valid]
+
+    growth = log_nav[end] - log_nav[start]
+    if window_days >= DAYS_PER_YEAR:
+        growth = growth * DAYS_PER_YEAR / (days[end] - days[start])
+    return days[start], np.expm1(growth) * 100
+
+def summarize_returns(values):
+    """Distribution summary of a set of rolling returns"""
+    if len(values) == 0:
+        return {'count': 0}
+    summary = {
+        'count': int(len(values)),
+        'min': round(float(values.min()), 2),
+        'max': round(float(values.max()), 2),
+        'avg': round(float(values.mean()), 2),
+        'positive_pct': round(float((values > 0).mean() * 100), 2),
+    }
+    for percentile, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        summary[f'p{percentile}'] = round(float(value), 2)
+    return summary
+
+def installment_days(start, end):
+    """Monthly installment dates from start to end on start's day of month, as days since epoch"""
+    start = np.datetime64(start, 'D')
+    months = np.arange(
+        start.astype('datetime64[M]'), np.datetime64(end, 'D').astype('datetime64[M]') + 1
+    )
+    day_of_month = (start - start.astype('datetime64[M]')).astype(np.int64)
+    # Clamp to the last day of short months
+    month_length = ((months + 1).astype('datetime64[D]') - months.astype('datetime64[D]')).astype(np.int64)
+    dates = months.astype('datetime64[D]') + np.minimum(day_of_month, month_length - 1)
+    dates = dates[(dates >= start) & (dates <= np.datetime64(end, 'D'))]
+    return (dates - EPOCH).astype(np.int64)
+
+def xirr(amounts, days, tolerance=1e-9, max_iterations=100):
+    """
+    Annualized internal rate of return of cash flows on the given days.
+    Newton's method with a bisection fallback; returns None when there is no root.
+    """
+    years = (days - days[0]) / DAYS_PER_YEAR
+
+    def npv(rate):
+        return np.sum(amounts * np.power(1 + rate, -years))
+
+    rate = 0.1
+    for _ in range(max_iterations):
+        discount = np.power(1 + rate, -years)
+        value = np.sum(amounts * discount)
+        derivative = np.sum(-years * amounts * discount / (1 + rate))
+        if derivative == 0:
+            break
+        step = value / derivative
+        rate -= step
+        if rate <= -1 or not np.isfinite(rate):
+            break
+        if abs(step) < tolerance:
+            return float(rate)
+
+    low, high = -0.9999, 10.0
+    if npv(low) * npv(high) > 0:
+        return None
+    for _ in range(200):
+        mid = (low + high) / 2
+        if npv(low) * npv(mid) <= 0:
+            high = mid
+        else:
+            low = mid
+        if high - low < tolerance:
+            break
+    return float((low + high) / 2)
+
+def simulate_sip(log_series, amount, start, end):
+    """
+    Invest amount on the first NAV on or after each monthly installment date and
+    value the holding at the last NAV on or before end.
+    Returns None when no installment falls inside the NAV history.
+    """
+    days = log_series[:, 0]
+    log_nav = log_series[:, 1]
+    if len(days) == 0:
+        return None
+
+    valuation = np.searchsorted(days, _days(end), side='right') - 1
+    if valuation < 0:
+        return None
+    # Installments before the first NAV are dropped rather than bunched onto it
+    scheduled = installment_days(start, end)
+    buy = np.searchsorted(days, scheduled[scheduled >= days[0]], side='left')
+    buy = buy[buy <= valuation]
+    if len(buy) == 0:
+        return None
+
+    invested = amount * len(buy)
+    # Units bought at nav_i are worth amount * nav_end / nav_i at the valuation date
+    value = amount * float(np.sum(np.exp(log_nav[valuation] - log_nav[buy])))
+    flows = np.append(np.full(len(buy), -float(amount)), value)
+    flow_days = np.append(days[buy], days[valuation])
+    rate = xirr(flows, flow_days) if flow_days[-1] > flow_days[0] else None
+
+    return {
+        'installments': int(len(buy)),
+        'invested': round(invested, 2),
+        'value': round(value, 2),
+        'gain': round(value - invested, 2),
+        'absolute_return': round((value / invested - 1) * 100, 2),
+        'xirr': round(rate * 100, 2) if rate is not None else None,
+        'first_installment': str(EPOCH + int(days[buy[0]])),
+        'valuation_date': str(EPOCH + int(days[valuation])),
+    }
@@ -0,0 +1,176 @@
+
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db import models
+from django.db.models import F, FilteredRelation, Q
+from rest_framework.exceptions import ValidationError
+
+from .models import Fund
+from .search import search_funds
+
+RETURN_PREFIX = 'returns_'
+RETURN_PERIOD_PATTERN = re.compile(r'^[0-9A-Za-z]{1,10}$')
+
+# Every numeric Fund column can be range-filtered and ordered
+NUMERIC_FIELDS = [
+    field.name for field in Fund._meta.concrete_fields
+    if isinstance(field, (models.DecimalField, models.IntegerField, models.FloatField))
+    and not field.primary_key
+]
+
+NULLABLE_FIELDS = [name for name in NUMERIC_FIELDS if Fund._meta.get_field(name).null]
+
+# Non-numeric columns accepted by ?ordering=
+ORDERING_EXTRA_FIELDS = ['scheme_name']
+
+def _camel(name):
+    return ''.join(part.capitalize() for part in name.split('_'))
+
+# min<Field>/max<Field> query parameters, e.g. minSharpeRatio or maxExpenseRatio
+RANGE_PARAMS = {
+    f'{prefix}{_camel(name)}': (name, lookup)
+    for name in NUMERIC_FIELDS
+    for prefix, lookup in (('min', 'gte'), ('max', 'lte'))
+}
+
+# minReturn1Y/maxReturn3Y and so on filter on a return period
+RETURN_PARAM_PATTERN = re.compile(r'^(min|max)Return([0-9A-Za-z]{1,10})$')
+
+def _parse_number(param, value):
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        raise ValidationError({param: "Must be a number"})
+    if not number.is_finite():
+        raise ValidationError({param: "Must be a finite number"})
+    return number
+
+def parse_range_filters(params):
+    """
+    Validate the min/max query parameters into (field, lookup, value) triples.
+    Return periods are named returns_<period>.
+    """
+    ranges = []
+    for param, value in params.items():
+        if value in (None, ''):
+            continue
+        if param in RANGE_PARAMS:
+            field, lookup = RANGE_PARAMS[param]
+        else:
+            match = RETURN_PARAM_PATTERN.match(param)
+            if not match:
+                continue
+            field = f'{RETURN_PREFIX}{match.group(2)}'
+            lookup = 'gte' if match.group(1) == 'min' else 'lte'
+        ranges.append((field, lookup, _parse_number(param, value)))
+
+    bounds = {}
+    for field, lookup, value in ranges:
+        bounds.setdefault(field, {})[lookup] = value
+    for field, bound in bounds.items():
+        if 'gte' in bound and 'lte' in bound and bound['gte'] > bound['lte']:
+            raise ValidationError({"detail": f"The minimum for {field} is above its maximum"})
+    return ranges
+
+def parse_ordering(value):
+    """
+    Validate ?ordering= (comma-separated, '-' for descending) into (field, descending) pairs.
+    Returns None when no ordering was asked for.
+    """
+    if not value:
+        return None
+    ordering = []
+    for item in value.split(','):
+        item = item.strip()
+        name = item.lstrip('-')
+        if not name:
+            continue
+        is_return = name.startswith(RETURN_PREFIX) and RETURN_PERIOD_PATTERN.match(name[len(RETURN_PREFIX):])
+        if name not in NUMERIC_FIELDS and name not in ORDERING_EXTRA_FIELDS and not is_return:
+            raise ValidationError({"ordering": f"Can't order by {name}"})
+        if any(name == seen for seen, _ in ordering):
+            continue
+        ordering.append((name, item.startswith('-')))
+    return ordering or None
+
+def _order_expression(name, descending):
+    # Funds without a value sort last in both directions
+    nulls = {'nulls_last': True} if name in NULLABLE_FIELDS else {}
+    return F(name).desc(**nulls) if descending else F(name).asc(**nulls)
+
+def apply_filters(queryset, params):
+    """
+    Apply the range filters and ordering in params to a Fund queryset as a single query.
+    Each return period used joins FundReturn once, shared by its filters and ordering.
+    """
+    ranges = parse_range_filters(params)
+    ordering = parse_ordering(params.get('ordering'))
+
+    used = [field for field, _, _ in ranges] + [name for name, _ in ordering or []]
+    periods = list(dict.fromkeys(
+        name[len(RETURN_PREFIX):] for name in used if name.startswith(RETURN_PREFIX)
+    ))
+    for period in periods:
+        relation = f'_returns_{period}'
+        queryset = queryset.annotate(**{
+            relation: FilteredRelation('returns_data', condition=Q(returns_data__period=period)),
+        }).annotate(**{f'{RETURN_PREFIX}{period}': F(f'{relation}__value')})
+        # Funds without the period are left out, which keeps the join an inner one
+        queryset = queryset.filter(**{f'{RETURN_PREFIX}{period}__isnull': False})
+
+    if ranges:
+        queryset = queryset.filter(**{f'{field}__{lookup}': value for field, lookup, value in ranges})
+
+    if ordering:
+        # The id tie-breaker follows the first key so one index serves the whole ordering
+        tie_breaker = F('id').desc() if ordering[0][1] else F('id').asc()
+        queryset = queryset.order_by(
+            *(_order_expression(name, descending) for name, descending in ordering), tie_breaker
+        )
+    return queryset
+
+def filter_funds(queryset, params):
+    """Apply the fund list query parameters (ids, category, AMC, search, ranges, ordering)"""
+    # Filter by specific fund IDs
+    fund_ids = params.get('fundIds')
+    if fund_ids:
+        return queryset.filter(scheme_code__in=fund_ids.split(','))
+
+    category = params.get('category')
+    amc = params.get('amc')
+    search_query = params.get('searchQuery')
+    if category:
+        queryset = queryset.filter(category=category)
+    if amc:
+        queryset = queryset.filter(amc=amc)
+    if search_query:
+        queryset = search_funds(queryset, search_query)
+    return apply_filters(queryset, params)
+
+def ordering_index_sql(field):
+    """PostgreSQL index serving ORDER BY field DESC NULLS LAST, id DESC"""
+    return (
+        f"CREATE INDEX IF NOT EXISTS fund_{field}_desc_idx "
+        f"ON funds_fund ({field} DESC NULLS LAST, id DESC)"
+    )
+
+def ensure_ordering_indexes(db):
+    """
+    Create descending nulls-last indexes for the nullable columns.
+    A btree scanned backwards returns nulls first, so the model's ascending indexes
+    can't serve these orderings; SQLite has no NULLS LAST indexes and is skipped.
+    """
+    if db.vendor != 'postgresql':
+        return
+    with db.cursor() as cursor:
+        for field in NULLABLE_FIELDS:
+            cursor.execute(ordering_index_sql(field))
+
+def drop_ordering_indexes(db):
+    """Remove the indexes created by ensure_ordering_indexes"""
+    if db.vendor != 'postgresql':
+        return
+    with db.cursor() as cursor:
+        for field in NULLABLE_FIELDS:
+            cursor.execute(f"DROP INDEX IF EXISTS fund_{field}_desc_idx")
@@ -0,0 +1,177 @@
+
+import contextvars
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.db import connection
+from django.utils import timezone
+
+from .models import IngestRun, JobStatus
+from .profiling import StackSampler, profile_path
+
+STAGES = ('fetch', 'transform', 'write', 'finalize')
+
+class IngestRecorder:
+    """
+    Stage timings and counters of an ingest run.
+    Stages nest: time in an inner stage is not counted in the outer one, so a streamed fetch
+    pulled through validation counts as fetch, not transform.
+    """
+
+    def __init__(self, run):
+        self.run = run
+        self.seconds = defaultdict(float)
+        self.records = 0
+        self.failed = 0
+        self.failure_reasons = {}
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.retries = 0
+        self.error = ''
+        self.summary = None
+        self._stack = []
+        self._mark = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        now = time.perf_counter()
+        if self._stack:
+            self.seconds[self._stack[-1]] += now - self._mark
+        self._stack.append(name)
+        self._mark = now
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self.seconds[self._stack.pop()] += now - self._mark
+            self._mark = now
+
+    def track_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_seconds += time.perf_counter() - started
+
+    def count_retry(self):
+        with self._lock:
+            self.retries += 1
+
+# The recorder of the ingest running in this context; copied into fetch threads
+_current = contextvars.ContextVar('funds_ingest_run', default=None)
+
+@contextmanager
+def stage(name):
+    """Time the block as one of STAGES of the current ingest run, if there is one"""
+    recorder = _current.get()
+    if recorder is None:
+        yield
+        return
+    with recorder.stage(name):
+        yield
+
+def timed_iter(name, iterable):
+    """Yield from iterable, timing each step as stage name"""
+    iterator = iter(iterable)
+    while True:
+        with stage(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+def read_records(records):
+    """Yield records from the source, timing reads as fetch and counting them"""
+    recorder = _current.get()
+    for record in timed_iter('fetch', records):
+        if recorder is not None:
+            recorder.records += 1
+        yield record
+
+def count_retry():
+    """Count an HTTP retry against the current ingest run"""
+    recorder = _current.get()
+    if recorder is not None:
+        recorder.count_retry()
+
+def record_validation(stats):
+    """Record the clean_records stats: rejected records and their reasons"""
+    recorder = _current.get()
+    if recorder is not None:
+        recorder.failed = stats.get('invalid', 0)
+        recorder.failure_reasons = dict(stats.get('reasons', {}))
+
+def record_error(message):
+    """Record why the current ingest run failed"""
+    recorder = _current.get()
+    if recorder is not None:
+        recorder.error = message
+
+@contextmanager
+def record_run(source, refresh_job=None, profile=False):
+    """
+    Record the ingest in the block as an IngestRun: stage timings, records read and rejected,
+    database round trips and HTTP retries. Set recorder.summary to the update_database result;
+    without one, or on an exception, the run is marked failed. With profile, the stacks of
+    the run are sampled and saved to PROFILE_DIR for a flame graph.
+    """
+    run = IngestRun.objects.create(source=source, refresh_job=refresh_job)
+    recorder = IngestRecorder(run)
+    token = _current.set(recorder)
+    sampler = StackSampler() if profile else None
+    if sampler is not None:
+        sampler.start()
+    started = time.perf_counter()
+    try:
+        # Only queries from this thread's connection, where the ingest writes, are counted
+        with connection.execute_wrapper(recorder.track_query):
+            yield recorder
+    except Exception as e:
+        recorder.error = recorder.error or str(e)
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        _current.reset(token)
+        if sampler is not None:
+            sampler.stop()
+            run.profile_file = profile_path(f'ingest-{run.pk}', 'folded')
+            sampler.save(run.profile_file)
+        _save_run(run, recorder, duration)
+
+def _save_run(run, recorder, duration):
+    stage_seconds = {name: round(recorder.seconds.get(name, 0.0), 3) for name in STAGES}
+    stage_seconds['other'] = round(max(duration - sum(recorder.seconds.values()), 0.0), 3)
+
+    run.status = JobStatus.SUCCEEDED if recorder.summary and not recorder.error else JobStatus.FAILED
+    run.finished_at = timezone.now()
+    run.duration_seconds = round(duration, 3)
+    run.stage_seconds = stage_seconds
+    run.records_read = recorder.records
+    run.records_per_second = round(recorder.records / duration, 1) if duration else None
+    run.records_failed = recorder.failed
+    run.failure_reasons = recorder.failure_reasons
+    run.db_queries = recorder.queries
+    run.db_seconds = round(recorder.db_seconds, 3)
+    run.http_retries = recorder.retries
+    if recorder.summary:
+        run.result = {key: value for key, value in recorder.summary.items() if key != 'changes'}
+        run.result['changes'] = len(recorder.summary['changes'])
+    run.error = recorder.error
+    run.save()
+
+def describe(run):
+    """One-line summary of an IngestRun"""
+    stages = ', '.join(f"{name} {seconds:.2f}s" for name, seconds in run.stage_seconds.items())
+    text = (
+        f"Ingest run {run.pk} ({run.source}) {run.status} in {run.duration_seconds:.2f}s: "
+        f"{run.records_read} records ({run.records_per_second or 0:g}/s), {run.records_failed} failed; "
+        f"{stages}; {run.db_queries} queries in {run.db_seconds:.2f}s; {run.http_retries} HTTP retries"
+    )
+    if run.profile_file:
+        text += f"; profile saved to {run.profile_file}"
+    return text
@@ -0,0 +1,162 @@
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, connections, router, transaction
+from django.utils import timezone
+
+from .models import JobStatus, RefreshJob
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = [JobStatus.QUEUED, JobStatus.RUNNING]
+
+def enqueue_refresh():
+    """
+    Queue a fund data refresh, or return the job already queued or running.
+    Returns (job, created).
+    """
+    _fail_stale_jobs()
+    try:
+        with transaction.atomic():
+            job = RefreshJob.objects.create()
+    except IntegrityError:
+        job = RefreshJob.objects.filter(status__in=ACTIVE_STATUSES).first()
+        if job is None:
+            # The active job finished between our insert and lookup
+            return enqueue_refresh()
+        return job, False
+
+    if settings.REFRESH_WORKER_MODE == 'thread':
+        start_worker_thread()
+    return job, True
+
+def _fail_stale_jobs():
+    """
+    Mark jobs left running by a crashed worker, or queued with no worker to claim them,
+    as failed so new refreshes can be queued
+    """
+    now = timezone.now()
+    RefreshJob.objects.filter(
+        status=JobStatus.RUNNING, started_at__lt=now - timedelta(seconds=settings.REFRESH_JOB_TIMEOUT)
+    ).update(status=JobStatus.FAILED, error='Timed out', finished_at=now)
+    # claim_next_job only takes jobs still queued, so a job is either claimed or failed here
+    RefreshJob.objects.filter(
+        status=JobStatus.QUEUED, created_at__lt=now - timedelta(seconds=settings.REFRESH_QUEUE_TIMEOUT)
+    ).update(
+        status=JobStatus.FAILED, finished_at=now,
+        error=f'No worker picked up the job within {settings.REFRESH_QUEUE_TIMEOUT}s; is run_refresh_worker running?'
+    )
+
+def claim_next_job():
+    """Atomically move the oldest queued job to running; returns None if the queue is empty"""
+    for job in RefreshJob.objects.filter(status=JobStatus.QUEUED).order_by('created_at')[:5]:
+        claimed = RefreshJob.objects.filter(pk=job.pk, status=JobStatus.QUEUED).update(
+            status=JobStatus.RUNNING, started_at=timezone.now()
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+class JobProgress:
+    """
+    Progress callback of a refresh job. The refresh writes inside one transaction, so progress
+    is saved from a thread with its own connection, where it commits and is seen by other
+    connections right away. SQLite allows one writer at a time, so there progress is only
+    saved when the job finishes.
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self.processed = None
+        self.total = None
+        self._executor = None
+        self._alias = router.db_for_write(RefreshJob)
+        if connections[self._alias].vendor != 'sqlite':
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='refresh-progress')
+
+    def __call__(self, processed, total):
+        self.processed, self.total = processed, total
+        if self._executor is not None:
+            self._executor.submit(self._save, processed, total).result()
+
+    def _save(self, processed, total):
+        RefreshJob.objects.using(self._alias).filter(pk=self.job.pk).update(
+            funds_processed=processed, funds_total=total
+        )
+
+    def close(self):
+        """Close the progress connection and return the last progress as update() fields"""
+        if self._executor is not None:
+            self._executor.submit(connections[self._alias].close).result()
+            self._executor.shutdown()
+        if self.processed is None:
+            return {}
+        return {'funds_processed': self.processed, 'funds_total': self.total}
+
+def run_job(job):
+    """Run a claimed refresh job and record its progress and outcome"""
+    from fund_data_service import main as refresh_data
+
+    progress = JobProgress(job)
+    try:
+        summary = refresh_data(progress=progress, refresh_job=job)
+    except Exception as e:
+        logger.exception("Refresh job %s failed", job.pk)
+        summary = None
+        error = str(e)
+    else:
+        error = '' if summary else 'No fund data fetched or database update failed'
+    finally:
+        final_progress = progress.close()
+
+    if summary:
+        result = {key: value for key, value in summary.items() if key != 'changes'}
+        result['changes'] = len(summary['changes'])
+        status = JobStatus.SUCCEEDED
+    else:
+        result = None
+        status = JobStatus.FAILED
+
+    RefreshJob.objects.filter(pk=job.pk).update(
+        status=status, result=result, error=error, finished_at=timezone.now(), **final_progress
+    )
+
+def run_pending_jobs():
+    """Run queued jobs until the queue is empty; returns the number of jobs run"""
+    count = 0
+    while True:
+        job = claim_next_job()
+        if job is None:
+            return count
+        run_job(job)
+        count += 1
+
+_worker_lock = threading.Lock()
+_worker_thread = None
+
+def start_worker_thread():
+    """Drain the queue in a daemon thread of this process, if one is not already running"""
+    global _worker_thread
+    with _worker_lock:
+        if _worker_thread is not None and _worker_thread.is_alive():
+            return
+        _worker_thread = threading.Thread(target=_drain_queue, name='refresh-worker', daemon=True)
+        _worker_thread.start()
+
+def _drain_queue():
+    global _worker_thread
+    try:
+        while True:
+            run_pending_jobs()
+            # Exit under the lock so a job queued meanwhile either sees us alive or starts a new thread
+            with _worker_lock:
+                if not RefreshJob.objects.filter(status=JobStatus.QUEUED).exists():
+                    _worker_thread = None
+                    return
+    finally:
+        connection.close()
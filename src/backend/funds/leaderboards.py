@@ -0,0 +1,77 @@
+
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+
+from .models import Fund, FundReturn, LeaderboardEntry
+
+RETURN_METRIC_PREFIX = 'returns_'
+
+# Fund metrics that can be ranked, and whether higher values rank first
+RANKING_METRICS = {
+    'sharpe_ratio': True,
+    'treynor_ratio': True,
+    'alpha': True,
+    'cagr': True,
+    'aum': True,
+    'expense_ratio': False,
+    'standard_deviation': False,
+    'beta': False,
+    'max_drawdown': False,
+}
+
+def is_ranked_metric(metric):
+    return metric in RANKING_METRICS or metric.startswith(RETURN_METRIC_PREFIX)
+
+def _load_frame():
+    """Funds with their category, ranking metrics and one returns_<period> column per period"""
+    frame = pd.DataFrame.from_records(
+        Fund.objects.values('id', 'scheme_name', 'category', *RANKING_METRICS),
+        columns=['id', 'scheme_name', 'category', *RANKING_METRICS],
+    ).set_index('id')
+    returns = pd.DataFrame.from_records(
+        FundReturn.objects.values_list('fund_id', 'period', 'value'), columns=['fund_id', 'period', 'value']
+    )
+    if not returns.empty:
+        returns = returns.pivot(index='fund_id', columns='period', values='value')
+        frame = frame.join(returns.add_prefix(RETURN_METRIC_PREFIX))
+    return frame
+
+def compute_leaderboards(size=None):
+    """Rank the top size funds for every metric, overall and within each category"""
+    size = size or settings.TOP_FUNDS_MAX_LIMIT
+    frame = _load_frame()
+    metrics = {
+        column: RANKING_METRICS.get(column, True)
+        for column in frame.columns if is_ranked_metric(column)
+    }
+    groups = [('', frame)] + list(frame.groupby('category'))
+
+    entries = []
+    for metric, descending in metrics.items():
+        for category, group in groups:
+            ranked = group[group[metric].notna()].reset_index().sort_values(
+                [metric, 'scheme_name', 'id'], ascending=[not descending, True, True]
+            ).head(size)
+            entries.extend(
+                LeaderboardEntry(metric=metric, category=category, rank=rank, fund_id=fund_id, value=value)
+                for rank, (fund_id, value) in enumerate(zip(ranked['id'], ranked[metric]), start=1)
+            )
+    return entries
+
+def refresh_leaderboards():
+    """Replace the stored leaderboards with freshly ranked ones"""
+    entries = compute_leaderboards()
+    with transaction.atomic():
+        LeaderboardEntry.objects.all().delete()
+        LeaderboardEntry.objects.bulk_create(entries, batch_size=1000)
+
+def top_fund_ids_query(metric, category='', limit=10):
+    """Query for the fund ids in rank order for a metric, read from the materialized leaderboard"""
+    return LeaderboardEntry.objects.filter(
+        metric=metric, category=category, rank__lte=limit
+    ).order_by('rank').values_list('fund_id', flat=True)
+
+def top_fund_ids(metric, category='', limit=10):
+    """Fund ids in rank order for a metric, read from the materialized leaderboard"""
+    return list(top_fund_ids_query(metric, category, limit))
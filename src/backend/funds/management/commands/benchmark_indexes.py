@@ -0,0 +1,186 @@
+
+import json
+import random
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import F
+from funds.filters import drop_ordering_indexes, ensure_ordering_indexes
+from funds.models import Fund, FundReturn, FundCategory
+from funds.routers import replica_aliases
+
+BENCH_PREFIX = 'BENCH'
+
+AMCS = [
+    "HDFC Mutual Fund", "ICICI Prudential", "SBI Mutual Fund",
+    "Axis Mutual Fund", "Kotak Mahindra", "Aditya Birla Sun Life",
+    "Nippon India", "Mirae Asset", "DSP", "UTI"
+]
+
+def benchmark_queries(using):
+    """Querysets mirroring the access paths of the fund list and top-funds endpoints"""
+    funds = Fund.objects.using(using)
+    return {
+        'list_default_page': funds.order_by('scheme_name', 'id')[:100],
+        'list_deep_page': funds.order_by('scheme_name', 'id')[50000:50100],
+        'category': funds.filter(category=FundCategory.DEBT).order_by('scheme_name')[:100],
+        'category_amc': funds.filter(
+            category=FundCategory.EQUITY, amc="HDFC Mutual Fund"
+        ).order_by('scheme_name')[:100],
+        'sharpe_range': funds.filter(sharpe_ratio__gte=1.5, sharpe_ratio__lte=1.6)[:100],
+        'beta_range': funds.filter(beta__gte=0.6, beta__lte=0.65)[:100],
+        'sharpe_desc': funds.order_by(F('sharpe_ratio').desc(nulls_last=True), '-id')[:100],
+        'top_funds': FundReturn.objects.using(using).filter(period='1Y').order_by('-value').values_list(
+            'fund_id', flat=True
+        )[:10],
+    }
+
+def _database_key(alias):
+    db = settings.DATABASES[alias]
+    return (connections[alias].vendor, str(db.get('NAME')), db.get('HOST') or '', str(db.get('PORT') or ''))
+
+def check_scratch_database(alias):
+    """Refuse to seed funds or drop indexes anywhere but a separate scratch database"""
+    if alias not in settings.DATABASES:
+        raise CommandError(
+            f"No database '{alias}'. Set BENCHMARK_DB_URL to a scratch database and run "
+            f"'python manage.py migrate --database {alias}'"
+        )
+    if (
+        alias == DEFAULT_DB_ALIAS or alias in replica_aliases()
+        or _database_key(alias) == _database_key(DEFAULT_DB_ALIAS)
+    ):
+        raise CommandError(f"Refusing to benchmark on '{alias}': it is the live database or a replica of it")
+
+class Command(BaseCommand):
+    help = 'Seed benchmark funds and record EXPLAIN plans and latencies with and without indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--funds', type=int, default=100000, help='Number of funds to seed')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per query')
+        parser.add_argument('--output', help='Write results as JSON to this file')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded funds afterwards')
+        parser.add_argument(
+            '--database', default='benchmark',
+            help='Scratch database to seed and benchmark; never the live one (default: benchmark, from BENCHMARK_DB_URL)'
+        )
+
+    def handle(self, *args, **options):
+        check_scratch_database(options['database'])
+        self.using = options['database']
+        self.seed(options['funds'])
+        try:
+            results = {
+                'without_indexes': self.run_without_indexes(options['repeat']),
+                'with_indexes': self.run_queries(options['repeat']),
+            }
+        finally:
+            if not options['keep']:
+                Fund.objects.using(self.using).filter(scheme_code__startswith=BENCH_PREFIX).delete()
+
+        for name in results['with_indexes']:
+            before = results['without_indexes'][name]
+            after = results['with_indexes'][name]
+            self.stdout.write(
+                f"{name}: {before['median_ms']:.2f} ms -> {after['median_ms']:.2f} ms"
+            )
+            for label, plan in (('before', before['plan']), ('after', after['plan'])):
+                self.stdout.write(f"  {label}:")
+                for line in plan.splitlines():
+                    self.stdout.write(f"    {line}")
+
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(results, handle, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def seed(self, count):
+        """Insert count synthetic funds with three return periods each"""
+        self.stdout.write(f'Seeding {count} benchmark funds...')
+        rng = random.Random(42)
+        categories = list(FundCategory.values)
+        today = date.today()
+
+        funds = Fund.objects.using(self.using)
+        with transaction.atomic(using=self.using):
+            funds.filter(scheme_code__startswith=BENCH_PREFIX).delete()
+            seeded = [
+                Fund(
+                    scheme_name=f"{AMCS[i % len(AMCS)]} Benchmark Fund {i}",
+                    amc=AMCS[i % len(AMCS)],
+                    scheme_code=f"{BENCH_PREFIX}{i:07d}",
+                    nav=round(rng.uniform(10, 500), 2),
+                    category=categories[i % len(categories)],
+                    expense_ratio=round(rng.uniform(0.1, 2.5), 2),
+                    aum=round(rng.uniform(100, 50000), 2),
+                    inception_date=today - timedelta(days=rng.randint(365, 7300)),
+                    standard_deviation=round(rng.uniform(5, 20), 2),
+                    sharpe_ratio=round(rng.uniform(-0.5, 2), 2),
+                    treynor_ratio=round(rng.uniform(0.1, 0.9), 2),
+                    beta=round(rng.uniform(0.6, 1.4), 2),
+                    alpha=round(rng.uniform(-2, 5), 2),
+                )
+                for i in range(count)
+            ]
+            funds.bulk_create(seeded, batch_size=5000)
+
+            fund_ids = funds.filter(
+                scheme_code__startswith=BENCH_PREFIX
+            ).values_list('id', flat=True)
+            FundReturn.objects.using(self.using).bulk_create(
+                (
+                    FundReturn(fund_id=fund_id, period=period, value=round(rng.uniform(-10, 30), 2), as_of_date=today)
+                    for fund_id in fund_ids
+                    for period in ('1Y', '3Y', '5Y')
+                ),
+                batch_size=5000
+            )
+
+        with connections[self.using].cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def run_queries(self, repeat):
+        """Time each benchmark query and capture its plan"""
+        results = {}
+        for name, queryset in benchmark_queries(self.using).items():
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(queryset._chain())
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            results[name] = {
+                'median_ms': timings[len(timings) // 2],
+                'p95_ms': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+                'plan': queryset.explain(),
+            }
+        return results
+
+    def run_without_indexes(self, repeat):
+        """
+        Drop the secondary indexes, run the queries, then restore the indexes. Besides the
+        model's indexes these are the descending nulls-last ones created outside the model
+        on PostgreSQL.
+        """
+        models = [Fund, FundReturn]
+        connection = connections[self.using]
+        with connection.schema_editor() as editor:
+            for model in models:
+                for index in model._meta.indexes:
+                    editor.remove_index(model, index)
+        drop_ordering_indexes(connection)
+        try:
+            with connections[self.using].cursor() as cursor:
+                cursor.execute('ANALYZE')
+            return self.run_queries(repeat)
+        finally:
+            with connections[self.using].schema_editor() as editor:
+                for model in models:
+                    for index in model._meta.indexes:
+                        editor.add_index(model, index)
+            ensure_ordering_indexes(connection)
+            with connections[self.using].cursor() as cursor:
+                cursor.execute('ANALYZE')
@@ -0,0 +1,50 @@
+
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+from rest_framework.pagination import PageNumberPagination
+from funds.views import FundViewSet
+
+class Command(BaseCommand):
+    help = 'Compare requests/sec of the fund list with FundSerializer and with the fast values() path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per variant')
+        parser.add_argument('--page-size', type=int, default=100, help='Funds per page')
+
+    def render(self, view, request):
+        response = view(request)
+        response.render()
+        return response.content
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        url = '/api/funds/'
+        # Page number pagination ignores ?page_size=, so the views get a paginator sized for the run
+        pagination_class = type('BenchmarkPagination', (PageNumberPagination,), {'page_size': options['page_size']})
+        dummy_cache = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+        # Bypass the response cache so every request serializes
+        with override_settings(CACHES=dummy_cache, ALLOWED_HOSTS=['*']):
+            outputs = {}
+            for label, fast in (('serializer', False), ('fast', True)):
+                view = FundViewSet.as_view(
+                    {'get': 'list'}, fast_serialization=fast, pagination_class=pagination_class
+                )
+                outputs[label] = self.render(view, factory.get(url))
+                started = time.perf_counter()
+                for _ in range(options['requests']):
+                    self.render(view, factory.get(url))
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{label:<10} {options['requests'] / elapsed:8.1f} req/s  "
+                    f"{elapsed / options['requests'] * 1000:6.2f} ms/req  "
+                    f"{len(json.loads(outputs[label])['results'])} funds  {len(outputs[label])} bytes"
+                )
+
+        if outputs['serializer'] == outputs['fast']:
+            self.stdout.write(self.style.SUCCESS('Responses are byte-identical'))
+        else:
+            self.stdout.write(self.style.ERROR('Responses differ'))
@@ -0,0 +1,74 @@
+
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import QueryDict
+from funds.filters import NUMERIC_FIELDS, ORDERING_EXTRA_FIELDS, RETURN_PREFIX, apply_filters
+from funds.models import Fund, FundCategory
+
+# A plan sorts the whole table when it both sorts (not incrementally) and scans every fund row;
+# sorting the rows an index lookup narrowed down, such as one category, is accepted
+SORT_PATTERNS = {
+    'postgresql': re.compile(r'^\s*(->\s*)?Sort\b', re.MULTILINE),
+    'sqlite': re.compile(r'USE TEMP B-TREE FOR ORDER BY'),
+}
+TABLE_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on funds_fund\b'),
+    'sqlite': re.compile(r'\bSCAN funds_fund\b'),
+}
+
+class Command(BaseCommand):
+    help = 'EXPLAIN every ?ordering= of the fund list, alone and with a tie-breaking key, and flag full-table sorts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period', default='1Y', help='Return period to check returns ordering with')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print the plan of every query')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database to EXPLAIN against')
+
+    def combinations(self, period):
+        fields = [*NUMERIC_FIELDS, *ORDERING_EXTRA_FIELDS, f'{RETURN_PREFIX}{period}']
+        screens = {
+            'all funds': {},
+            'category': {'category': FundCategory.EQUITY},
+            'range filter': {'minAum': '1000'},
+        }
+        orderings = []
+        for field in fields:
+            # Later keys only break ties within the leading key's index order, which the planner may
+            # sort incrementally; what must not happen is sorting the whole table for the first key
+            secondary = 'scheme_name' if field == 'expense_ratio' else 'expense_ratio'
+            for prefix in ('', '-'):
+                orderings += [f'{prefix}{field}', f'{prefix}{field},-{secondary}']
+        for ordering in orderings:
+            for label, filters in screens.items():
+                yield ordering, label, filters
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        sort_pattern = SORT_PATTERNS.get(connection.vendor)
+        scan_pattern = TABLE_SCAN_PATTERNS.get(connection.vendor)
+        if sort_pattern is None:
+            raise CommandError(f'Plan checks are not supported on {connection.vendor}')
+
+        failures = []
+        for ordering, label, filters in self.combinations(options['period']):
+            params = QueryDict(mutable=True)
+            params.update({**filters, 'ordering': ordering})
+            queryset = Fund.objects.using(options['database'])
+            if 'category' in filters:
+                queryset = queryset.filter(category=filters['category'])
+            plan = apply_filters(queryset, params)[:100].explain()
+
+            sorted_fully = bool(sort_pattern.search(plan) and scan_pattern.search(plan))
+            if sorted_fully:
+                failures.append((ordering, label))
+            status = self.style.ERROR('SORT') if sorted_fully else self.style.SUCCESS('ok  ')
+            self.stdout.write(f'{status} ordering={ordering} ({label})')
+            if options['verbose_plans'] or sorted_fully:
+                for line in plan.splitlines():
+                    self.stdout.write(f'       {line}')
+
+        if failures:
+            raise CommandError(f'{len(failures)} orderings fall back to a full-table sort')
+        self.stdout.write(self.style.SUCCESS('Every leading ordering key is served by an index'))
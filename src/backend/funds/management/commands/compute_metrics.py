@@ -0,0 +1,31 @@
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from funds.analytics import WINDOWS, load_benchmark_file, recompute_fund_metrics
+
+class Command(BaseCommand):
+    help = 'Recompute fund risk metrics from NAV history against a benchmark index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window', choices=list(WINDOWS), default='3Y', help='Trailing window')
+        parser.add_argument('--risk-free', type=float, help='Annual risk-free rate in percent')
+        parser.add_argument('--benchmark', help='Benchmark symbol; defaults to BENCHMARK_SYMBOL')
+        parser.add_argument(
+            '--benchmark-file', help='Load benchmark values from a CSV with date and value columns first'
+        )
+
+    def handle(self, *args, **options):
+        symbol = options['benchmark'] or settings.BENCHMARK_SYMBOL
+        if options['benchmark_file']:
+            count = load_benchmark_file(options['benchmark_file'], symbol)
+            self.stdout.write(f'Loaded {count} {symbol} values')
+
+        started = time.monotonic()
+        count = recompute_fund_metrics(
+            window=options['window'], risk_free_rate=options['risk_free'], benchmark_symbol=symbol
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Computed {options['window']} metrics for {count} funds in {time.monotonic() - started:.2f}s"
+        ))
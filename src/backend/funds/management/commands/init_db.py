@@ -1,6 +1,7 @@
 
 from django.core.management.base import BaseCommand
 from funds.models import Fund, FundReturn
+from funds.materialized import refresh_materialized_data
 from datetime import datetime, timedelta
 import random
 
@@ -47,4 +48,6 @@ class Command(BaseCommand):
                     as_of_date=datetime.now()
                 )
 
+        refresh_materialized_data()
+
         self.stdout.write(self.style.SUCCESS('Successfully created sample data'))
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import time
+from collections import Counter
+from itertools import count
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+DEFAULT_PATHS = ['/api/funds/', '/api/top-funds/', '/api/amcs/', '/api/metrics-stats/']
+
+CLIENT_ERRORS = (OSError, EOFError, ValueError, asyncio.TimeoutError, asyncio.IncompleteReadError)
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response; returns (status, body bytes, whether the connection stays open)"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise EOFError('Connection closed by the server')
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    size = 0
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            chunk_size = int((await reader.readline()).split(b';')[0], 16)
+            if chunk_size == 0:
+                while await reader.readline() not in (b'\r\n', b'\n', b''):
+                    pass
+                break
+            await reader.readexactly(chunk_size + 2)
+            size += chunk_size
+    elif 'content-length' in headers:
+        size = int(headers['content-length'])
+        await reader.readexactly(size)
+    elif status not in (204, 304):
+        # Body runs until the server closes the connection
+        return status, len(await reader.read()), False
+    return status, size, headers.get('connection', '').lower() != 'close'
+
+def percentile(values, pct):
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+async def run_load(base_url, paths, connections, duration, timeout, bust_cache):
+    """Keep connections clients requesting paths round-robin for duration seconds"""
+    parts = urlsplit(base_url)
+    if parts.scheme != 'http':
+        raise CommandError(f'Only http:// targets are supported, got {base_url}')
+    host, port, prefix = parts.hostname, parts.port or 80, parts.path.rstrip('/')
+    latencies, statuses, errors = [], Counter(), Counter()
+    received = 0
+    sequence = count()
+    deadline = time.monotonic() + duration
+
+    async def client():
+        nonlocal received
+        reader = writer = None
+        while time.monotonic() < deadline:
+            number = next(sequence)
+            path = prefix + paths[number % len(paths)]
+            if bust_cache:
+                # A parameter the API ignores, so every request misses the response cache
+                path += f"{'&' if '?' in path else '?'}_load={number}"
+            request = f'GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nAccept: application/json\r\n\r\n'
+
+            started = time.perf_counter()
+            keep_alive = False
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+                writer.write(request.encode('latin-1'))
+                status, size, keep_alive = await asyncio.wait_for(read_response(reader), timeout)
+            except CLIENT_ERRORS as exc:
+                errors[type(exc).__name__] += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+                statuses[status] += 1
+                received += size
+            if not keep_alive and writer is not None:
+                writer.close()
+                writer = None
+        if writer is not None:
+            writer.close()
+
+    started = time.monotonic()
+    await asyncio.gather(*(client() for _ in range(connections)))
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        'url': base_url,
+        'connections': connections,
+        'seconds': round(elapsed, 2),
+        'requests': len(latencies),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else None,
+        'bytes': received,
+        'statuses': {str(status): total for status, total in sorted(statuses.items())},
+        'errors': dict(errors),
+    }
+
+class Command(BaseCommand):
+    help = 'Load-test running API servers, e.g. sync gunicorn against async uvicorn, with many concurrent connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', action='append', metavar='NAME=URL',
+            help='Server to test, e.g. sync=http://127.0.0.1:8000; repeat to compare several',
+        )
+        parser.add_argument('--path', action='append', help=f"Path to request; default {' '.join(DEFAULT_PATHS)}")
+        parser.add_argument('--connections', type=int, default=1000, help='Concurrent connections')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds per target')
+        parser.add_argument('--timeout', type=float, default=30, help='Seconds before a request counts as failed')
+        parser.add_argument('--bust-cache', action='store_true', help='Make every request miss the response cache')
+        parser.add_argument('--output', help='Write results as JSON to this file')
+
+    def handle(self, *args, **options):
+        targets = {}
+        for target in options['target'] or ['local=http://127.0.0.1:8000']:
+            name, sep, url = target.partition('=')
+            if not sep:
+                raise CommandError(f'--target must look like NAME=URL, got {target}')
+            targets[name] = url
+        self.raise_file_limit(options['connections'])
+
+        results = {}
+        for name, url in targets.items():
+            self.stdout.write(f"{name}: {options['connections']} connections for {options['duration']:g}s against {url}")
+            results[name] = asyncio.run(run_load(
+                url, options['path'] or DEFAULT_PATHS, options['connections'],
+                options['duration'], options['timeout'], options['bust_cache'],
+            ))
+
+        self.stdout.write(f"{'target':<12}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}  statuses")
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<12}{result['requests_per_second']:>10}{result['p50_ms'] or '-':>10}"
+                f"{result['p95_ms'] or '-':>10}{result['p99_ms'] or '-':>10}"
+                f"{sum(result['errors'].values()):>8}  {result['statuses']}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(results, handle, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def raise_file_limit(self, connections):
+        """Each connection needs a file descriptor; raise the soft limit as far as allowed"""
+        if resource is None:
+            return
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        wanted = connections + 100
+        if soft != resource.RLIM_INFINITY and soft < wanted:
+            limit = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+            resource.setrlimit(resource.RLIMIT_NOFILE, (limit, hard))
+            if limit < wanted:
+                self.stdout.write(self.style.WARNING(
+                    f'Open file limit is {limit}; connections beyond it will fail (raise it with ulimit -n)'
+                ))
@@ -1,6 +1,7 @@
 
 from django.core.management.base import BaseCommand
 from funds.models import Fund, FundReturn
+from funds.materialized import refresh_materialized_data
 from datetime import datetime
 import random
 
@@ -76,4 +77,6 @@ class Command(BaseCommand):
                     as_of_date=datetime.now().date()
                 )
 
+        refresh_materialized_data()
+
         self.stdout.write(self.style.SUCCESS('Successfully populated fund data'))
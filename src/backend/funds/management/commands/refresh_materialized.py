@@ -0,0 +1,10 @@
+
+from django.core.management.base import BaseCommand
+from funds.materialized import refresh_materialized_data
+
+class Command(BaseCommand):
+    help = 'Rebuild the metric statistics and top-fund leaderboards from the current fund data'
+
+    def handle(self, *args, **options):
+        version = refresh_materialized_data()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt materialized data; data version is now {version}'))
@@ -0,0 +1,25 @@
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from funds.jobs import run_pending_jobs
+
+class Command(BaseCommand):
+    help = 'Run queued fund data refresh jobs from the database queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between queue polls')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Waiting for refresh jobs...')
+        while True:
+            # Apply CONN_MAX_AGE and the health checks between polls, as Django does between requests
+            close_old_connections()
+            count = run_pending_jobs()
+            if count:
+                self.stdout.write(self.style.SUCCESS(f'Ran {count} refresh job(s)'))
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,13 @@
+
+from .cache import bump_data_version
+from .leaderboards import refresh_leaderboards
+from .stats import refresh_metric_snapshots
+
+def refresh_materialized_data():
+    """
+    Rebuild data derived from the fund tables at ingest time.
+    Call this after fund data has been committed; it also invalidates cached responses.
+    """
+    refresh_metric_snapshots()
+    refresh_leaderboards()
+    return bump_data_version()
@@ -0,0 +1,338 @@
+
+import contextvars
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import FileResponse
+from django.utils.crypto import constant_time_compare
+
+from .profiling import RequestProfile
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_lock = threading.Lock()
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class Histogram:
+    """Prometheus histogram kept in process memory, one series per combination of label values"""
+
+    def __init__(self, name, documentation, labels, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, value, *label_values):
+        with _lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series['buckets'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def expose(self, series):
+        """Text exposition lines for series, as collected by collect()"""
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for label_values, values in sorted(series.items()):
+            labels = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets, values['buckets']):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{float(bound)!r}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {values["count"]}')
+            lines.append(f'{self.name}_sum{{{labels}}} {values["sum"]!r}')
+            lines.append(f'{self.name}_count{{{labels}}} {values["count"]}')
+        return lines
+
+REQUEST_DURATION = Histogram(
+    'fund_api_request_duration_seconds', 'Time to respond, including streaming the body',
+    ('endpoint', 'method', 'status'), LATENCY_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    'fund_api_request_db_queries', 'Database queries per request', ('endpoint',), QUERY_BUCKETS,
+)
+DB_DURATION = Histogram(
+    'fund_api_request_db_seconds', 'Time per request spent running database queries',
+    ('endpoint',), LATENCY_BUCKETS,
+)
+SERIALIZE_DURATION = Histogram(
+    'fund_api_request_serialize_seconds', 'Time per request building response data with serializers',
+    ('endpoint',), LATENCY_BUCKETS,
+)
+RENDER_DURATION = Histogram(
+    'fund_api_request_render_seconds', 'Time per request encoding response data as JSON',
+    ('endpoint',), LATENCY_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    'fund_api_response_size_bytes', 'Response body size', ('endpoint',), SIZE_BUCKETS,
+)
+HISTOGRAMS = (REQUEST_DURATION, DB_QUERIES, DB_DURATION, SERIALIZE_DURATION, RENDER_DURATION, RESPONSE_SIZE)
+
+def _snapshot():
+    with _lock:
+        return {
+            histogram.name: {
+                label_values: {**values, 'buckets': list(values['buckets'])}
+                for label_values, values in histogram.series.items()
+            }
+            for histogram in HISTOGRAMS
+        }
+
+# With METRICS_DIR every process writes its series to a file there, and /metrics sums the files
+_flusher_pid = None
+
+def _metrics_file(pid):
+    return os.path.join(settings.METRICS_DIR, f'metrics-{pid}.json')
+
+def flush():
+    """Write this process's series to METRICS_DIR"""
+    data = {
+        name: [[list(label_values), values] for label_values, values in series.items()]
+        for name, series in _snapshot().items()
+    }
+    path = _metrics_file(os.getpid())
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    with open(f'{path}.tmp', 'w') as handle:
+        json.dump(data, handle)
+    os.replace(f'{path}.tmp', path)
+
+def _flush_loop():
+    while True:
+        time.sleep(settings.METRICS_FLUSH_INTERVAL)
+        try:
+            flush()
+        except OSError as e:
+            logger.warning(f"Could not write metrics to {settings.METRICS_DIR}: {e}")
+
+def _start_flusher():
+    """Start flushing this process's series in the background, once per process"""
+    global _flusher_pid
+    if not settings.METRICS_DIR or _flusher_pid == os.getpid():
+        return
+    with _lock:
+        # Another thread may have started it meanwhile
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+    threading.Thread(target=_flush_loop, name='metrics-flush', daemon=True).start()
+
+def collect():
+    """Series of every histogram, for this process or, with METRICS_DIR, summed over all processes"""
+    if not settings.METRICS_DIR:
+        return _snapshot()
+
+    flush()
+    merged = {histogram.name: {} for histogram in HISTOGRAMS}
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, 'metrics-*.json')):
+        try:
+            with open(path) as handle:
+                data = json.load(handle)
+        except (OSError, ValueError):
+            continue
+        for name, series in data.items():
+            if name not in merged:
+                continue
+            for label_values, values in series:
+                total = merged[name].setdefault(
+                    tuple(label_values), {'buckets': [0] * len(values['buckets']), 'sum': 0.0, 'count': 0}
+                )
+                if len(total['buckets']) != len(values['buckets']):
+                    # Written with other buckets by an older release
+                    continue
+                total['buckets'] = [a + b for a, b in zip(total['buckets'], values['buckets'])]
+                total['sum'] += values['sum']
+                total['count'] += values['count']
+    return merged
+
+def render_metrics():
+    """Every histogram in the Prometheus text format"""
+    data = collect()
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.expose(data[histogram.name]))
+    return '\n'.join(lines) + '\n'
+
+class RequestStats:
+    """Database, serialize and render time of one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.seconds = {'db': 0.0, 'serialize': 0.0, 'render': 0.0}
+
+# The stats of the request being handled; copied into sync_to_async threads with the context
+_current = contextvars.ContextVar('funds_request_stats', default=None)
+
+def record_query(seconds):
+    """Count a database query against the current request"""
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.seconds['db'] += seconds
+
+@contextmanager
+def timed(step):
+    """Add the time spent in the block to the current request's serialize or render time"""
+    stats = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if stats is not None:
+            stats.seconds[step] += time.perf_counter() - started
+
+def endpoint_label(request):
+    """The URL name a request resolved to, so the label has one value per endpoint"""
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else 'unmatched'
+
+def profile_requested(request):
+    """Whether the request carries X-Profile set to PROFILE_TOKEN"""
+    token = settings.PROFILE_TOKEN
+    return bool(token) and constant_time_compare(request.headers.get('X-Profile', ''), token)
+
+class RequestMetricsMiddleware:
+    """
+    Record latency, database queries and time, serialize and render time and response size
+    per endpoint, log slow requests, and cProfile requests asking for it with X-Profile.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token, profile = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats, profile)
+
+    async def __acall__(self, request):
+        stats, token, profile = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats, profile)
+
+    def start(self, request):
+        _start_flusher()
+        stats = RequestStats()
+        token = _current.set(stats)
+        profile = None
+        if profile_requested(request):
+            profile = RequestProfile()
+            if not profile.start():
+                logger.warning(f"Not profiling {request.get_full_path()}: another profile is running")
+                profile = None
+        return stats, token, profile
+
+    def process_template_response(self, request, response):
+        """Time the rendering of DRF responses, which Django runs right after this hook"""
+        stats = _current.get()
+        if stats is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                stats.seconds['render'] += time.perf_counter() - started
+            response.add_post_render_callback(rendered)
+        return response
+
+    def finish(self, request, response, stats, profile):
+        endpoint = endpoint_label(request)
+        if profile is not None:
+            response.headers['X-Profile-File'] = profile.stop(f'{request.method}-{endpoint}')
+
+        if response.streaming and not isinstance(response, FileResponse):
+            # The body is generated while it is sent, so the request ends with the stream
+            response.streaming_content = self.measure_stream(request, response, endpoint, stats)
+            return response
+        if response.streaming:
+            size = int(response.get('Content-Length') or 0)
+        else:
+            size = len(response.content)
+        self.record(request, response, endpoint, stats, size)
+        return response
+
+    def measure_stream(self, request, response, endpoint, stats):
+        """Wrap the streamed body, counting its size and the time spent generating it as render time"""
+        content = response.streaming_content
+        if response.is_async:
+            async def measured():
+                size = 0
+                iterator = content.__aiter__()
+                try:
+                    while True:
+                        started = time.perf_counter()
+                        try:
+                            chunk = await iterator.__anext__()
+                        except StopAsyncIteration:
+                            break
+                        finally:
+                            stats.seconds['render'] += time.perf_counter() - started
+                        size += len(chunk)
+                        yield chunk
+                finally:
+                    self.record(request, response, endpoint, stats, size)
+        else:
+            def measured():
+                size = 0
+                iterator = iter(content)
+                try:
+                    while True:
+                        started = time.perf_counter()
+                        try:
+                            chunk = next(iterator)
+                        except StopIteration:
+                            break
+                        finally:
+                            stats.seconds['render'] += time.perf_counter() - started
+                        size += len(chunk)
+                        yield chunk
+                finally:
+                    self.record(request, response, endpoint, stats, size)
+        return measured()
+
+    def record(self, request, response, endpoint, stats, size):
+        duration = time.perf_counter() - stats.started
+        REQUEST_DURATION.observe(duration, endpoint, request.method, str(response.status_code))
+        DB_QUERIES.observe(stats.queries, endpoint)
+        DB_DURATION.observe(stats.seconds['db'], endpoint)
+        SERIALIZE_DURATION.observe(stats.seconds['serialize'], endpoint)
+        RENDER_DURATION.observe(stats.seconds['render'], endpoint)
+        RESPONSE_SIZE.observe(size, endpoint)
+
+        if 0 < settings.SLOW_REQUEST_SECONDS <= duration:
+            logger.warning(
+                f"Slow request {request.method} {request.get_full_path()} ({endpoint}, {response.status_code}): "
+                f"{duration * 1000:.0f} ms, {stats.queries} queries in {stats.seconds['db'] * 1000:.0f} ms, "
+                f"serialize {stats.seconds['serialize'] * 1000:.0f} ms, render {stats.seconds['render'] * 1000:.0f} ms, "
+                f"{size} bytes"
+            )
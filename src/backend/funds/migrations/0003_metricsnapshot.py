@@ -0,0 +1,27 @@
+# Generated by Django 4.2.9 on 2026-10-18 09:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('funds', '0002_dataversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(blank=True, default='', max_length=50)),
+                ('sub_category', models.CharField(blank=True, default='', max_length=100)),
+                ('fund_count', models.IntegerField(default=0)),
+                ('stats', models.JSONField(default=dict)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('category', 'sub_category')},
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.9 on 2026-10-18 09:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('funds', '0003_metricsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fund',
+            index=models.Index(fields=['scheme_name', 'id'], name='fund_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fund',
+            index=models.Index(fields=['category', 'amc', 'scheme_name'], name='fund_category_amc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fund',
+            index=models.Index(fields=['amc', 'scheme_name'], name='fund_amc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fund',
+            index=models.Index(condition=models.Q(('standard_deviation__isnull', False)), fields=['standard_deviation'], name='fund_std_dev_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fund',
+            index=models.Index(condition=models.Q(('sharpe_ratio__isnull', False)), fields=['sharpe_ratio'], name='fund_sharpe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fund',
+            index=models.Index(condition=models.Q(('treynor_ratio__isnull', False)), fields=['treynor_ratio'], name='fund_treynor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fund',
+            index=models.Index(condition=models.Q(('beta__isnull', False)), fields=['beta'], name='fund_beta_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fund',
+            index=models.Index(condition=models.Q(('alpha__isnull', False)), fields=['alpha'], name='fund_alpha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fundreturn',
+            index=models.Index(fields=['period', '-value', 'fund'], name='fundreturn_period_value_idx'),
+        ),
+    ]
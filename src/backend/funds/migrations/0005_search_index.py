@@ -0,0 +1,92 @@
+
+from django.db import migrations
+
+# A frozen copy of the search structures as of this migration; funds.search maintains them
+# afterwards, so later edits there must not change what this migration does
+FTS_TABLE = 'funds_fund_fts'
+
+SQLITE_SEARCH_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        scheme_name, amc,
+        content='funds_fund', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON funds_fund BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, scheme_name, amc) VALUES (new.id, new.scheme_name, new.amc);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON funds_fund BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, scheme_name, amc)
+        VALUES ('delete', old.id, old.scheme_name, old.amc);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF scheme_name, amc ON funds_fund BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, scheme_name, amc)
+        VALUES ('delete', old.id, old.scheme_name, old.amc);
+        INSERT INTO {FTS_TABLE}(rowid, scheme_name, amc) VALUES (new.id, new.scheme_name, new.amc);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+SQLITE_DROP_SQL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+POSTGRES_SEARCH_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS fund_name_trgm_idx ON funds_fund USING gin (scheme_name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS fund_amc_trgm_idx ON funds_fund USING gin (amc gin_trgm_ops)",
+]
+
+POSTGRES_DROP_SQL = [
+    "DROP INDEX IF EXISTS fund_name_trgm_idx",
+    "DROP INDEX IF EXISTS fund_amc_trgm_idx",
+    "DROP INDEX IF EXISTS fund_search_vector_idx",
+]
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            for statement in SQLITE_SEARCH_SQL:
+                cursor.execute(statement)
+    elif connection.vendor == 'postgresql':
+        from django.contrib.postgres.indexes import GinIndex
+        from django.contrib.postgres.search import SearchVector
+
+        with connection.cursor() as cursor:
+            for statement in POSTGRES_SEARCH_SQL:
+                cursor.execute(statement)
+        schema_editor.add_index(
+            apps.get_model('funds', 'Fund'),
+            GinIndex(SearchVector('scheme_name', 'amc', config='simple'), name='fund_search_vector_idx'),
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    statements = {'sqlite': SQLITE_DROP_SQL, 'postgresql': POSTGRES_DROP_SQL}.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('funds', '0004_fund_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
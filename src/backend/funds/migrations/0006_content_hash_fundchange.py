@@ -0,0 +1,31 @@
+# Generated by Django 4.2.9 on 2026-10-18 09:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('funds', '0005_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FundChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scheme_code', models.CharField(db_index=True, max_length=50)),
+                ('change_type', models.CharField(choices=[('added', 'Added'), ('modified', 'Modified'), ('removed', 'Removed')], max_length=10)),
+                ('data_version', models.PositiveBigIntegerField(db_index=True)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-changed_at', 'scheme_code'],
+            },
+        ),
+        migrations.AddField(
+            model_name='fund',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.9 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('funds', '0007_refreshjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataprovider',
+            name='priority',
+            field=models.IntegerField(default=100),
+        ),
+        migrations.AddField(
+            model_name='dataprovider',
+            name='requests_per_second',
+            field=models.FloatField(default=5.0),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.9 on 2026-10-18 10:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('funds', '0008_provider_priority'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FundNav',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('nav', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('fund', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='nav_history', to='funds.fund')),
+            ],
+            options={
+                'ordering': ['fund', 'date'],
+                'unique_together': {('fund', 'date')},
+            },
+        ),
+    ]
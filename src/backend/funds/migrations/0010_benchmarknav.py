@@ -0,0 +1,26 @@
+# Generated by Django 4.2.9 on 2026-10-18 10:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('funds', '0009_fundnav'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BenchmarkNav',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=50)),
+                ('date', models.DateField()),
+                ('value', models.DecimalField(decimal_places=4, max_digits=14)),
+            ],
+            options={
+                'ordering': ['symbol', 'date'],
+                'unique_together': {('symbol', 'date')},
+            },
+        ),
+    ]
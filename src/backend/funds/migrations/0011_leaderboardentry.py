@@ -0,0 +1,29 @@
+# Generated by Django 4.2.9 on 2026-10-18 10:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('funds', '0010_benchmarknav'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(max_length=50)),
+                ('category', models.CharField(blank=True, default='', max_length=50)),
+                ('rank', models.PositiveIntegerField()),
+                ('value', models.DecimalField(decimal_places=4, max_digits=16)),
+                ('fund', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='funds.fund')),
+            ],
+            options={
+                'ordering': ['metric', 'category', 'rank'],
+                'unique_together': {('metric', 'category', 'rank')},
+            },
+        ),
+    ]
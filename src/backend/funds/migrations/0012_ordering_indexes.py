@@ -0,0 +1,122 @@
+# Generated by Django 4.2.9 on 2026-10-18 10:13
+
+from django.db import migrations, models
+
+
+# A frozen copy of funds.filters.NULLABLE_FIELDS as of this migration. Each gets a PostgreSQL
+# index serving ORDER BY field DESC NULLS LAST, id DESC; a btree scanned backwards returns
+# nulls first, so the ascending model indexes can't. SQLite has no NULLS LAST indexes.
+NULLABLE_FIELDS = [
+    'min_sip_amount', 'min_lumpsum', 'standard_deviation', 'sharpe_ratio', 'treynor_ratio',
+    'beta', 'alpha', 'cagr', 'max_drawdown',
+]
+
+
+def create_ordering_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for field in NULLABLE_FIELDS:
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS fund_{field}_desc_idx "
+                f"ON funds_fund ({field} DESC NULLS LAST, id DESC)"
+            )
+
+
+def drop_ordering_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for field in NULLABLE_FIELDS:
+            cursor.execute(f"DROP INDEX IF EXISTS fund_{field}_desc_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('funds', '0011_leaderboardentry'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='fund',
+            name='fund_std_dev_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='fund',
+            name='fund_sharpe_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='fund',
+            name='fund_treynor_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='fund',
+            name='fund_beta_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='fund',
+            name='fund_alpha_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='fundreturn',
+            name='fundreturn_period_value_idx',
+        ),
+        migrations.AddIndex(
+            model_name='fund',
+            index=models.Index(fields=['nav', 'id'], name='fund_nav_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fund',
+            index=models.Index(fields=['expense_ratio', 'id'], name='fund_expense_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fund',
+            index=models.Index(fields=['aum', 'id'], name='fund_aum_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fund',
+            index=models.Index(fields=['risk_rating', 'id'], name='fund_risk_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fund',
+            index=models.Index(fields=['min_sip_amount', 'id'], name='fund_min_sip_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fund',
+            index=models.Index(fields=['min_lumpsum', 'id'], name='fund_lumpsum_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fund',
+            index=models.Index(fields=['standard_deviation', 'id'], name='fund_std_dev_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fund',
+            index=models.Index(fields=['sharpe_ratio', 'id'], name='fund_sharpe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fund',
+            index=models.Index(fields=['treynor_ratio', 'id'], name='fund_treynor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fund',
+            index=models.Index(fields=['beta', 'id'], name='fund_beta_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fund',
+            index=models.Index(fields=['alpha', 'id'], name='fund_alpha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fund',
+            index=models.Index(fields=['cagr', 'id'], name='fund_cagr_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fund',
+            index=models.Index(fields=['max_drawdown', 'id'], name='fund_drawdown_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fundreturn',
+            index=models.Index(fields=['period', 'value', 'fund'], name='fundreturn_period_value_idx'),
+        ),
+        migrations.RunPython(create_ordering_indexes, drop_ordering_indexes),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.9 on 2026-10-18 10:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('funds', '0012_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='running', max_length=10)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('duration_seconds', models.FloatField(blank=True, null=True)),
+                ('stage_seconds', models.JSONField(blank=True, default=dict)),
+                ('records_read', models.IntegerField(default=0)),
+                ('records_per_second', models.FloatField(blank=True, null=True)),
+                ('records_failed', models.IntegerField(default=0)),
+                ('failure_reasons', models.JSONField(blank=True, default=dict)),
+                ('db_queries', models.IntegerField(default=0)),
+                ('db_seconds', models.FloatField(default=0)),
+                ('http_retries', models.IntegerField(default=0)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('profile_file', models.CharField(blank=True, default='', max_length=255)),
+                ('refresh_job', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ingest_runs', to='funds.refreshjob')),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+    ]
@@ -20,6 +20,17 @@ class RiskRating(models.IntegerChoices):
     MODERATE_HIGH = 4, "Moderate High"
     HIGH = 5, "High"
 
+class ChangeType(models.TextChoices):
+    ADDED = "added", "Added"
+    MODIFIED = "modified", "Modified"
+    REMOVED = "removed", "Removed"
+
+class JobStatus(models.TextChoices):
+    QUEUED = "queued", "Queued"
+    RUNNING = "running", "Running"
+    SUCCEEDED = "succeeded", "Succeeded"
+    FAILED = "failed", "Failed"
+
 class Fund(models.Model):
     scheme_name = models.CharField(max_length=255)
     amc = models.CharField(max_length=255)
@@ -53,13 +64,41 @@ class Fund(models.Model):
     alpha = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     cagr = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
     max_drawdown = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+
+    # SHA-256 of the last ingested source record, used to skip unchanged schemes
+    content_hash = models.CharField(max_length=64, blank=True, default='')
     
     class Meta:
         ordering = ['scheme_name']
-        
+        indexes = [
+            models.Index(fields=['scheme_name', 'id'], name='fund_name_id_idx'),
+            models.Index(fields=['category', 'amc', 'scheme_name'], name='fund_category_amc_idx'),
+            models.Index(fields=['amc', 'scheme_name'], name='fund_amc_idx'),
+            # Back ?ordering= and range filters on each numeric column (see funds.filters);
+            # descending nulls-last orderings get extra PostgreSQL indexes from a migration
+            models.Index(fields=['nav', 'id'], name='fund_nav_idx'),
+            models.Index(fields=['expense_ratio', 'id'], name='fund_expense_idx'),
+            models.Index(fields=['aum', 'id'], name='fund_aum_idx'),
+            models.Index(fields=['risk_rating', 'id'], name='fund_risk_idx'),
+            models.Index(fields=['min_sip_amount', 'id'], name='fund_min_sip_idx'),
+            models.Index(fields=['min_lumpsum', 'id'], name='fund_lumpsum_idx'),
+            models.Index(fields=['standard_deviation', 'id'], name='fund_std_dev_idx'),
+            models.Index(fields=['sharpe_ratio', 'id'], name='fund_sharpe_idx'),
+            models.Index(fields=['treynor_ratio', 'id'], name='fund_treynor_idx'),
+            models.Index(fields=['beta', 'id'], name='fund_beta_idx'),
+            models.Index(fields=['alpha', 'id'], name='fund_alpha_idx'),
+            models.Index(fields=['cagr', 'id'], name='fund_cagr_idx'),
+            models.Index(fields=['max_drawdown', 'id'], name='fund_drawdown_idx'),
+        ]
+
     def __str__(self):
         return f"{self.scheme_name} - {self.amc}"
 
+# The advanced metrics above, computed from NAV history by funds.analytics
+METRIC_FIELDS = [
+    'standard_deviation', 'sharpe_ratio', 'treynor_ratio', 'beta', 'alpha', 'cagr', 'max_drawdown'
+]
+
 class FundReturn(models.Model):
     fund = models.ForeignKey(Fund, on_delete=models.CASCADE, related_name='returns_data')
     period = models.CharField(max_length=10)  # e.g., "1Y", "3Y", "5Y"
@@ -68,15 +107,160 @@ class FundReturn(models.Model):
     
     class Meta:
         unique_together = ('fund', 'period')
-        
+        indexes = [
+            # Serves returns range filters and ?ordering=returns_<period> in either direction
+            models.Index(fields=['period', 'value', 'fund'], name='fundreturn_period_value_idx'),
+        ]
+
     def __str__(self):
         return f"{self.fund.scheme_name} - {self.period}: {self.value}%"
 
+class FundNav(models.Model):
+    """Daily NAV history; (fund, date) is unique and indexed in that order for range reads"""
+    fund = models.ForeignKey(Fund, on_delete=models.CASCADE, related_name='nav_history')
+    date = models.DateField()
+    nav = models.DecimalField(max_digits=12, decimal_places=4)
+
+    class Meta:
+        ordering = ['fund', 'date']
+        unique_together = ('fund', 'date')
+
+    def __str__(self):
+        return f"{self.fund_id} {self.date}: {self.nav}"
+
+class BenchmarkNav(models.Model):
+    """Daily level of a benchmark index, used for beta, alpha and Treynor ratio"""
+    symbol = models.CharField(max_length=50)
+    date = models.DateField()
+    value = models.DecimalField(max_digits=14, decimal_places=4)
+
+    class Meta:
+        ordering = ['symbol', 'date']
+        unique_together = ('symbol', 'date')
+
+    def __str__(self):
+        return f"{self.symbol} {self.date}: {self.value}"
+
 class DataProvider(models.Model):
     name = models.CharField(max_length=100)
     api_key = models.CharField(max_length=255)
     base_url = models.URLField()
     is_active = models.BooleanField(default=True)
+    # Lower values win when several providers report the same scheme
+    priority = models.IntegerField(default=100)
+    requests_per_second = models.FloatField(default=5.0)
     
     def __str__(self):
         return self.name
+
+class DataVersion(models.Model):
+    """Single-row counter bumped whenever fund data is reloaded"""
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"v{self.version} ({self.updated_at})"
+
+class MetricSnapshot(models.Model):
+    """
+    Precomputed distribution statistics for the screener metrics.
+    Blank category/sub_category rows hold the statistics for the wider group.
+    """
+    category = models.CharField(max_length=50, blank=True, default='')
+    sub_category = models.CharField(max_length=100, blank=True, default='')
+    fund_count = models.IntegerField(default=0)
+    stats = models.JSONField(default=dict)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('category', 'sub_category')
+
+    def __str__(self):
+        return f"{self.category or 'All'} / {self.sub_category or 'All'} ({self.fund_count} funds)"
+
+class LeaderboardEntry(models.Model):
+    """
+    Ranked top funds for one metric, materialized at ingest.
+    A blank category holds the ranking across all funds; returns are ranked as returns_<period>.
+    """
+    metric = models.CharField(max_length=50)
+    category = models.CharField(max_length=50, blank=True, default='')
+    rank = models.PositiveIntegerField()
+    fund = models.ForeignKey(Fund, on_delete=models.CASCADE, related_name='+')
+    value = models.DecimalField(max_digits=16, decimal_places=4)
+
+    class Meta:
+        ordering = ['metric', 'category', 'rank']
+        unique_together = ('metric', 'category', 'rank')
+
+    def __str__(self):
+        return f"{self.metric} / {self.category or 'All'} #{self.rank}: {self.fund_id}"
+
+class FundChange(models.Model):
+    """Change log entry written by each ingestion run"""
+    scheme_code = models.CharField(max_length=50, db_index=True)
+    change_type = models.CharField(max_length=10, choices=ChangeType.choices)
+    data_version = models.PositiveBigIntegerField(db_index=True)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-changed_at', 'scheme_code']
+
+    def __str__(self):
+        return f"{self.scheme_code} {self.change_type} (v{self.data_version})"
+
+class RefreshJob(models.Model):
+    """A queued or completed fund data refresh, picked up by a background worker"""
+    job_type = models.CharField(max_length=20, default='refresh')
+    status = models.CharField(max_length=10, choices=JobStatus.choices, default=JobStatus.QUEUED)
+    funds_processed = models.IntegerField(default=0)
+    funds_total = models.IntegerField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            # At most one queued or running job per type; concurrent requests coalesce onto it
+            models.UniqueConstraint(
+                fields=['job_type'],
+                condition=models.Q(status__in=['queued', 'running']),
+                name='refreshjob_one_active_per_type'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.job_type} #{self.pk} ({self.status})"
+
+class IngestRun(models.Model):
+    """Timings and counts of one fund data load, to tell whether fetch, transform or writes are slow"""
+    source = models.CharField(max_length=255)
+    status = models.CharField(max_length=10, choices=JobStatus.choices, default=JobStatus.RUNNING)
+    refresh_job = models.ForeignKey(
+        RefreshJob, null=True, blank=True, on_delete=models.SET_NULL, related_name='ingest_runs'
+    )
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration_seconds = models.FloatField(null=True, blank=True)
+    # Seconds per stage (fetch, transform, write, finalize, other); they add up to the duration
+    stage_seconds = models.JSONField(default=dict, blank=True)
+    records_read = models.IntegerField(default=0)
+    records_per_second = models.FloatField(null=True, blank=True)
+    records_failed = models.IntegerField(default=0)
+    # Rejected records per reason
+    failure_reasons = models.JSONField(default=dict, blank=True)
+    db_queries = models.IntegerField(default=0)
+    db_seconds = models.FloatField(default=0)
+    http_retries = models.IntegerField(default=0)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    profile_file = models.CharField(max_length=255, blank=True, default='')
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"{self.source} #{self.pk} ({self.status})"
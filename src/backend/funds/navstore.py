@@ -0,0 +1,163 @@
+
+import glob
+import os
+import tempfile
+from datetime import date
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .cache import get_data_version
+from .models import FundNav
+
+EPOCH = np.datetime64('1970-01-01', 'D')
+
+# Bucket keys for server-side downsampling; the last NAV of each bucket is kept
+RESAMPLE_RULES = {
+    'W': lambda days: (days + 3) // 7,  # ISO weeks starting on Monday
+    'M': lambda days: (EPOCH + days).astype('datetime64[M]').astype(np.int64),
+    'Q': lambda days: (EPOCH + days).astype('datetime64[M]').astype(np.int64) // 3,
+    'Y': lambda days: (EPOCH + days).astype('datetime64[Y]').astype(np.int64),
+}
+
+def _cache_path(fund_id, version, kind='nav'):
+    return os.path.join(settings.NAV_CACHE_DIR, f"{fund_id}.{kind}.{version}.npy")
+
+def _to_days(value):
+    return (np.datetime64(value, 'D') - EPOCH).astype(np.int64)
+
+def load_nav_series(fund_id, version=None):
+    """
+    Return a read-only (n, 2) float64 array of [days since epoch, nav] sorted by date.
+    Served from a memory-mapped .npy file, which is built from FundNav on first use.
+    Files are named by the data version, so every process stops using them once a data
+    load bumps it, and a rebuild racing a load is saved under the version it started at.
+    """
+    if version is None:
+        version = get_data_version()
+    path = _cache_path(fund_id, version)
+    try:
+        return np.load(path, mmap_mode='r')
+    except (FileNotFoundError, ValueError):
+        pass
+
+    rows = FundNav.objects.filter(fund_id=fund_id).order_by('date').values_list('date', 'nav')
+    series = np.array(
+        [(_to_days(nav_date), float(nav)) for nav_date, nav in rows], dtype=np.float64
+    ).reshape(-1, 2)
+    _save_version(fund_id, version, 'nav', series)
+    return series
+
+def load_log_series(fund_id):
+    """
+    Return a read-only (n, 2) float64 array of [days since epoch, log(nav / first nav)].
+    The log return between any two points is the difference of their values, so
+    window returns cost O(1) once the array is loaded. Cached next to the NAV series.
+    """
+    version = get_data_version()
+    path = _cache_path(fund_id, version, 'log')
+    try:
+        return np.load(path, mmap_mode='r')
+    except (FileNotFoundError, ValueError):
+        pass
+
+    series = np.array(load_nav_series(fund_id, version))
+    if len(series):
+        series[:, 1] = np.log(series[:, 1] / series[0, 1])
+    _save_version(fund_id, version, 'log', series)
+    return series
+
+def _cached_versions(fund_id, kind):
+    """The data versions of the files cached for a fund, with their paths"""
+    for path in glob.glob(os.path.join(settings.NAV_CACHE_DIR, f"{fund_id}.{kind}.*.npy")):
+        version = os.path.basename(path).split('.')[2]
+        if version.isdigit():
+            yield int(version), path
+
+def _save_version(fund_id, version, kind, series):
+    """Cache the series for version and drop the fund's files from older versions"""
+    _write_atomic(_cache_path(fund_id, version, kind), series)
+    for cached_version, path in _cached_versions(fund_id, kind):
+        if cached_version < version:
+            _unlink(path)
+
+def _write_atomic(path, array):
+    """Write the array to a temporary file and rename it so readers never see a partial file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    handle, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as tmp:
+            np.save(tmp, array)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+def invalidate_nav_cache(fund_ids):
+    """Drop this machine's cached series for funds whose NAV history changed"""
+    for fund_id in fund_ids:
+        for kind in ('nav', 'log'):
+            for _, path in _cached_versions(fund_id, kind):
+                _unlink(path)
+
+def nav_range(series, start=None, end=None):
+    """Slice a series to [start, end] dates with a binary search on the sorted day column"""
+    days = series[:, 0]
+    lo = np.searchsorted(days, _to_days(start), side='left') if start else 0
+    hi = np.searchsorted(days, _to_days(end), side='right') if end else len(days)
+    return series[lo:hi]
+
+def resample_series(series, rule):
+    """Downsample to the last NAV of each week ('W'), month ('M'), quarter ('Q') or year ('Y')"""
+    if rule in (None, '', 'D') or len(series) == 0:
+        return series
+    keys = RESAMPLE_RULES[rule](series[:, 0].astype(np.int64))
+    last_in_bucket = np.append(np.flatnonzero(np.diff(keys)), len(keys) - 1)
+    return series[last_in_bucket]
+
+def auto_resample_rule(series, max_points):
+    """Pick the finest rule that keeps the series within max_points"""
+    for rule in ('D', 'W', 'M', 'Q', 'Y'):
+        if len(resample_series(series, rule)) <= max_points:
+            return rule
+    return 'Y'
+
+def series_dates(series):
+    """ISO date strings for the day column of a series"""
+    return np.datetime_as_string(EPOCH + series[:, 0].astype(np.int64), unit='D').tolist()
+
+def upsert_nav_points(points, batch_size):
+    """
+    Insert or update (fund_id, date, nav) points and invalidate the affected caches.
+    Returns the number of points written.
+    """
+    # One row per (fund, date), last point wins; an upsert may not touch a row twice
+    deduped = {}
+    for fund_id, nav_date, nav in points:
+        if isinstance(nav_date, str):
+            nav_date = date.fromisoformat(nav_date)
+        deduped[(fund_id, nav_date)] = nav
+    if not deduped:
+        return 0
+    FundNav.objects.bulk_create(
+        [FundNav(fund_id=fund_id, date=nav_date, nav=nav) for (fund_id, nav_date), nav in deduped.items()],
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['fund', 'date'],
+        update_fields=['nav'],
+    )
+    fund_ids = {fund_id for fund_id, _ in deduped}
+    # Readers move to new files when the data version is bumped; this only frees the disk early
+    transaction.on_commit(lambda: invalidate_nav_cache(fund_ids))
+    return len(deduped)
+
+def parse_date(value):
+    """Parse an ISO date query parameter; returns None when absent"""
+    return date.fromisoformat(value) if value else None
@@ -0,0 +1,234 @@
+
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from django.db.models import F, OrderBy, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+def use_cursor_pagination(request):
+    """Cursor pagination is opt-in through ?pagination=cursor or an explicit cursor"""
+    params = request.query_params
+    return params.get('pagination') == 'cursor' or 'cursor' in params
+
+def _encode_value(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+def ordering_fields(queryset):
+    """
+    The queryset ordering as (field, descending) pairs, from names like '-aum' or F() orderings.
+    Returns None if any part of the ordering is a more complex expression.
+    """
+    fields = []
+    for item in queryset.query.order_by or queryset.model._meta.ordering:
+        if isinstance(item, str):
+            name, descending = item.lstrip('-'), item.startswith('-')
+        elif isinstance(item, OrderBy) and isinstance(item.expression, F):
+            name, descending = item.expression.name, item.descending
+        else:
+            return None
+        fields.append(('id' if name == 'pk' else name, descending))
+    return fields
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over the queryset's active ordering.
+
+    The cursor holds the ordering values of the last row served, so each page is
+    an index range scan instead of OFFSET. The primary key is appended to the
+    ordering as a tie-breaker, and nullable columns always sort nulls last.
+    The total count is skipped unless requested with ?count=exact or ?count=estimate.
+    """
+    page_size = 100
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page = self.page_queryset(queryset, request)
+        self.count = self.get_count(queryset, request)
+        return self.finish_page(list(page[:self.page_size + 1]))
+
+    async def apaginate_queryset(self, queryset, request):
+        """paginate_queryset for async views, querying through the async ORM"""
+        page = self.page_queryset(queryset, request)
+        self.count = await self.aget_count(queryset, request)
+        return self.finish_page([row async for row in page[:self.page_size + 1]])
+
+    def page_queryset(self, queryset, request):
+        """Order queryset for the requested cursor and keep only the rows after it"""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+
+        cursor = self.decode_cursor(request)
+        self.has_cursor = cursor is not None
+        self.reverse = bool(cursor and cursor['r'])
+
+        queryset = queryset.order_by(*self.order_expressions(queryset, self.reverse))
+        if cursor:
+            queryset = queryset.filter(self.keyset_filter(queryset, cursor['v'], self.reverse))
+        return queryset
+
+    def finish_page(self, results):
+        """Trim the page_size + 1 rows fetched after the cursor to the page and set the links"""
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+
+        # Moving backwards, "more" rows lie before the page; a next page always exists
+        if self.reverse:
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = self.has_cursor, has_more
+
+        self.first_row = results[0] if results else None
+        self.last_row = results[-1] if results else None
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_ordering(self, queryset):
+        """Return (field, descending) pairs for the queryset ordering plus a pk tie-breaker"""
+        fields = ordering_fields(queryset)
+        if fields is None:
+            raise NotFound('Cursor pagination does not support this ordering')
+        if not any(name == 'id' for name, _ in fields):
+            fields.append(('id', False))
+        return fields
+
+    def _is_nullable(self, queryset, name):
+        annotation = queryset.query.annotations.get(name)
+        if annotation is not None:
+            return getattr(annotation.output_field, 'null', False)
+        try:
+            return queryset.model._meta.get_field(name).null
+        except FieldDoesNotExist:
+            return False
+
+    def order_expressions(self, queryset, reverse):
+        expressions = []
+        for name, descending in self.ordering:
+            if reverse:
+                descending = not descending
+            if self._is_nullable(queryset, name):
+                # Nulls stay last going forwards, so they come first when reversed
+                nulls = {'nulls_first': True} if reverse else {'nulls_last': True}
+                expressions.append(F(name).desc(**nulls) if descending else F(name).asc(**nulls))
+            else:
+                expressions.append(F(name).desc() if descending else F(name).asc())
+        return expressions
+
+    def keyset_filter(self, queryset, values, reverse):
+        """Rows strictly after the cursor row in the (possibly reversed) ordering"""
+        if len(values) != len(self.ordering):
+            raise NotFound('Invalid cursor')
+
+        condition = Q(pk__in=[])
+        prefix = Q()
+        for (name, descending), value in zip(self.ordering, values):
+            nullable = self._is_nullable(queryset, name)
+            after = self._after(name, descending, value, reverse, nullable)
+            if after is not None:
+                condition |= prefix & after
+            prefix &= Q(**{f'{name}__isnull': True}) if value is None else Q(**{name: value})
+        return condition
+
+    def _after(self, name, descending, value, reverse, nullable):
+        if not reverse:
+            if value is None:
+                return None
+            after = Q(**{f"{name}__{'lt' if descending else 'gt'}": value})
+            return after | Q(**{f'{name}__isnull': True}) if nullable else after
+        if value is None:
+            return Q(**{f'{name}__isnull': False})
+        return Q(**{f"{name}__{'gt' if descending else 'lt'}": value})
+
+    def get_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == 'exact':
+            return queryset.count()
+        if mode == 'estimate':
+            return estimate_count(queryset)
+        return None
+
+    async def aget_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == 'exact':
+            return await queryset.acount()
+        if mode == 'estimate':
+            return await sync_to_async(estimate_count)(queryset)
+        return None
+
+    def encode_cursor(self, row, reverse):
+        values = [_encode_value(getattr(row, name)) for name, _ in self.ordering]
+        raw = json.dumps({'v': values, 'r': reverse}, separators=(',', ':'))
+        return urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            return {'v': list(cursor['v']), 'r': bool(cursor['r'])}
+        except (TypeError, ValueError, KeyError):
+            raise NotFound('Invalid cursor')
+
+    def _link(self, cursor):
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, 'page')
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        if not self.has_next or self.last_row is None:
+            return None
+        return self._link(self.encode_cursor(self.last_row, reverse=False))
+
+    def get_previous_link(self):
+        if not self.has_previous or self.first_row is None:
+            return None
+        return self._link(self.encode_cursor(self.first_row, reverse=True))
+
+def estimate_count(queryset):
+    """
+    Estimate the row count from the query planner where the database offers one.
+    Falls back to an exact count elsewhere.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
@@ -0,0 +1,257 @@
+
+import codecs
+import csv
+import json
+import logging
+import os
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import models
+
+from .models import AumCategory, Fund, FundCategory, FundNav, FundReturn, RiskRating
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 64 * 1024
+
+REQUIRED_FIELDS = ['scheme_code', 'scheme_name', 'amc', 'nav', 'expense_ratio', 'aum', 'inception_date']
+
+# Applied when a record leaves these non-nullable fields empty
+FIELD_DEFAULTS = {
+    'category': FundCategory.OTHER,
+    'aum_category': AumCategory.SMALL,
+    'risk_rating': RiskRating.MODERATE,
+}
+
+RETURN_COLUMN_PREFIX = 'returns_'
+
+# Fund columns taken from records, converted to their field types by clean_records
+RECORD_FIELDS = [field for field in Fund._meta.concrete_fields if field.name not in ('id', 'content_hash')]
+
+class JsonStreamParser:
+    """
+    Incrementally parse fund records out of JSON text arriving in chunks.
+
+    Accepts a top-level array of records, or an object whose "results" key holds
+    that array; other keys of the object (such as "next") are collected in meta.
+    Only the record being decoded is held in memory, not the whole document.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.exhausted = False
+        self.meta = {}
+        # '[' or '{' once the top-level container has been seen
+        self.container = None
+        self._text = codecs.getincrementaldecoder('utf-8')()
+
+    def _fill(self):
+        for chunk in self.chunks:
+            if isinstance(chunk, bytes):
+                # The incremental decoder keeps multi-byte characters split across chunks intact
+                chunk = self._text.decode(chunk)
+            if chunk:
+                self.buffer = self.buffer[self.pos:] + chunk
+                self.pos = 0
+                return True
+        self.exhausted = True
+        return False
+
+    def _peek(self):
+        """Return the next non-whitespace character without consuming it"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return None
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError(f"Expected '{char}' at offset {self.pos}")
+        self.pos += 1
+
+    def _decode(self):
+        """Decode the next complete JSON value, reading more input as needed"""
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(self.buffer) and not self.exhausted and not isinstance(value, (dict, list)):
+                if self._fill():
+                    continue
+            self.pos = end
+            return value
+
+    def _iter_array(self):
+        self._expect('[')
+        if self._peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self._decode()
+            char = self._peek()
+            self.pos += 1
+            if char == ']':
+                return
+            if char != ',':
+                raise ValueError(f"Expected ',' or ']' at offset {self.pos}")
+
+    def __iter__(self):
+        char = self._peek()
+        self.container = char
+        if char == '[':
+            yield from self._iter_array()
+        elif char == '{':
+            self.pos += 1
+            while self._peek() != '}':
+                key = self._decode()
+                self._expect(':')
+                if key == 'results' and self._peek() == '[':
+                    yield from self._iter_array()
+                else:
+                    self.meta[key] = self._decode()
+                if self._peek() == ',':
+                    self.pos += 1
+            self.pos += 1
+        elif char is not None:
+            raise ValueError("Expected a JSON array or object of fund records")
+
+def iter_json_lines(lines):
+    """Yield one record per non-empty line of JSON Lines input"""
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+def iter_csv_records(lines):
+    """
+    Yield records from CSV rows with Fund field names as headers.
+    Columns named returns_<period> (e.g. returns_1Y) are collected into the returns map.
+    """
+    for row in csv.DictReader(lines):
+        record = {'returns': {}}
+        for column, value in row.items():
+            if column and column.startswith(RETURN_COLUMN_PREFIX):
+                if value not in (None, ''):
+                    record['returns'][column[len(RETURN_COLUMN_PREFIX):]] = value
+            elif column:
+                record[column] = value
+        yield record
+
+def _read_chunks(handle):
+    while True:
+        chunk = handle.read(READ_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+def iter_file_records(path, file_format=None):
+    """Stream records from a local JSON, JSON Lines or CSV file"""
+    if file_format is None:
+        extension = os.path.splitext(path)[1].lower()
+        file_format = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}.get(extension, 'json')
+
+    with open(path, newline='' if file_format == 'csv' else None, encoding='utf-8') as handle:
+        if file_format == 'csv':
+            yield from iter_csv_records(handle)
+        elif file_format == 'jsonl':
+            yield from iter_json_lines(handle)
+        else:
+            yield from JsonStreamParser(_read_chunks(handle))
+
+def clean_records(records, stats=None):
+    """
+    Validate and normalize records one at a time.
+    Empty strings become None, missing choice fields get their model defaults, and values
+    are converted to their field types (Decimal rounded to the column's places, date, int).
+    Records without the required fields, or with a value that does not convert or fit its
+    column, are skipped and counted in stats['invalid'], and per reason in stats['reasons'].
+    """
+    for record in records:
+        if not isinstance(record, dict):
+            _reject(stats, record, 'not an object')
+            continue
+
+        record = {key: (None if value == '' else value) for key, value in record.items()}
+        missing = [field for field in REQUIRED_FIELDS if record.get(field) is None]
+        if missing:
+            _reject(stats, record, f"missing {', '.join(missing)}")
+            continue
+
+        for field, default in FIELD_DEFAULTS.items():
+            if record.get(field) is None:
+                record[field] = default
+        if not isinstance(record.get('returns'), dict):
+            record['returns'] = {}
+
+        try:
+            _convert_record(record)
+        except ValidationError as e:
+            _reject(stats, record, e.message)
+            continue
+        yield record
+
+def _convert_record(record):
+    """Convert the values of record in place; raises ValidationError naming the bad field"""
+    for field in RECORD_FIELDS:
+        if record.get(field.name) is not None:
+            record[field.name] = _convert(field, record[field.name], field.name)
+
+    record['returns'] = {
+        _convert(FundReturn._meta.get_field('period'), period, 'returns'):
+            _convert(FundReturn._meta.get_field('value'), value, 'returns')
+        for period, value in record['returns'].items()
+        if value not in (None, '')
+    }
+
+    if record.get('nav_date') is not None:
+        record['nav_date'] = _convert(FundNav._meta.get_field('date'), record['nav_date'], 'nav_date')
+
+    history = record.get('nav_history')
+    if history is not None:
+        if not isinstance(history, list) or not all(isinstance(point, dict) for point in history):
+            raise ValidationError('invalid nav_history')
+        record['nav_history'] = [
+            {
+                'date': _convert(FundNav._meta.get_field('date'), point.get('date'), 'nav_history'),
+                'nav': _convert(FundNav._meta.get_field('nav'), point.get('nav'), 'nav_history'),
+            }
+            for point in history
+        ]
+
+def _convert(field, value, name):
+    """value as field's Python type, checked against the column; raises ValidationError('invalid name')"""
+    try:
+        if value is None or isinstance(value, (bool, dict, list)):
+            raise ValidationError('not a scalar')
+        value = field.to_python(value)
+        if isinstance(field, models.DecimalField):
+            # Rounded like the database backends do, then checked to fit max_digits
+            value = value.quantize(Decimal(1).scaleb(-field.decimal_places))
+            if abs(value) >= 10 ** (field.max_digits - field.decimal_places):
+                raise ValidationError('out of range')
+        else:
+            field.validate(value, None)
+            field.run_validators(value)
+    except (ValidationError, InvalidOperation):
+        raise ValidationError(f'invalid {name}')
+    return value
+
+def _reject(stats, record, reason):
+    if stats is not None:
+        stats['invalid'] = stats.get('invalid', 0) + 1
+        reasons = stats.setdefault('reasons', {})
+        reasons[reason] = reasons.get(reason, 0) + 1
+    scheme_code = record.get('scheme_code') if isinstance(record, dict) else None
+    logger.warning("Skipping invalid fund record %s: %s", scheme_code, reason)
@@ -0,0 +1,93 @@
+
+import cProfile
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Only one profiler can run at a time in a process
+_lock = threading.Lock()
+
+def profile_path(label, extension='prof'):
+    """A new file in PROFILE_DIR for a profile of label"""
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    name = re.sub(r'[^A-Za-z0-9_.-]+', '_', label)
+    return os.path.join(
+        settings.PROFILE_DIR, f"{time.strftime('%Y%m%dT%H%M%S')}-{name}-{os.getpid()}.{extension}"
+    )
+
+class RequestProfile:
+    """
+    cProfile of the calling thread, saved in pstats format (snakeviz, flameprof, pstats).
+    start() returns False when another profile is already running in this process.
+    """
+
+    def __init__(self):
+        self.profiler = None
+
+    def start(self):
+        if not _lock.acquire(blocking=False):
+            return False
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+        return True
+
+    def stop(self, label):
+        """Stop profiling and save the profile; returns the file name"""
+        try:
+            self.profiler.disable()
+            path = profile_path(label)
+            self.profiler.dump_stats(path)
+        finally:
+            _lock.release()
+        logger.info(f"Saved profile of {label} to {path}")
+        return os.path.basename(path)
+
+class StackSampler:
+    """
+    Sample the stack of every thread each interval seconds from a background thread.
+    save() writes the samples in the collapsed format read by flamegraph.pl, speedscope and
+    inferno: one line per distinct stack, thread name then frames root first, joined by ';',
+    followed by the number of samples. Cheap enough to leave on for a whole ingest run.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._sample, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _sample(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.samples[';'.join(part.replace(';', ':') for part in reversed(stack))] += 1
+
+    def save(self, path):
+        with open(path, 'w') as handle:
+            for stack, count in self.samples.most_common():
+                handle.write(f"{stack} {count}\n")
@@ -0,0 +1,116 @@
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import models
+from rest_framework.exceptions import ValidationError
+
+from .metrics import timed
+from .models import Fund, FundReturn
+from .pagination import ordering_fields
+from .serializers import FundSerializer
+
+# Fields a client may request with ?fields=, in FundSerializer output order
+FUND_FIELDS = FundSerializer.Meta.fields
+
+def parse_fields(value):
+    """
+    Parse a comma-separated fields parameter into FundSerializer field names.
+    Returns None when the parameter is absent, meaning all fields.
+    """
+    if not value:
+        return None
+    requested = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = requested.difference(FUND_FIELDS)
+    if unknown:
+        raise ValidationError({"fields": f"Unknown fields: {', '.join(sorted(unknown))}"})
+    return [name for name in FUND_FIELDS if name in requested]
+
+def project_queryset(queryset, fields):
+    """
+    Turn a Fund queryset into a values_list of named rows holding the columns for fields.
+    The id and the ordering columns are always selected so pagination keeps working.
+    """
+    ordering = [name for name, _ in ordering_fields(queryset) or []]
+    columns = ['id' if name == 'pk' else name for name in ['id', *fields, *ordering] if name != 'returns']
+    return queryset.prefetch_related(None).values_list(*dict.fromkeys(columns), named=True)
+
+def _decimal_converter(field):
+    exponent = Decimal(1).scaleb(-field.decimal_places)
+
+    def convert(value):
+        if value is None:
+            return None
+        if not isinstance(value, Decimal):
+            value = Decimal(str(value))
+        return '{:f}'.format(value.quantize(exponent))
+    return convert
+
+def _date_converter(value):
+    return value.isoformat() if value is not None else None
+
+def field_converters(fields):
+    """
+    Per-field functions producing the same values FundSerializer would:
+    Decimals as fixed-point strings and dates in ISO format.
+    """
+    converters = {}
+    for name in fields:
+        if name == 'returns':
+            continue
+        field = Fund._meta.get_field(name)
+        if isinstance(field, models.DecimalField):
+            converters[name] = _decimal_converter(field)
+        elif isinstance(field, models.DateField):
+            converters[name] = _date_converter
+        else:
+            converters[name] = None
+    return converters
+
+def _returns_rows(fund_ids):
+    return FundReturn.objects.filter(fund_id__in=list(fund_ids)).values_list('fund_id', 'period', 'value')
+
+def fund_returns(fund_ids):
+    """Returns maps for the given funds in a single query, shaped like FundSerializer.returns"""
+    returns = defaultdict(dict)
+    for fund_id, period, value in _returns_rows(fund_ids):
+        returns[fund_id][period] = value
+    return returns
+
+async def afund_returns(fund_ids):
+    """fund_returns through the async ORM"""
+    returns = defaultdict(dict)
+    async for fund_id, period, value in _returns_rows(fund_ids):
+        returns[fund_id][period] = value
+    return returns
+
+def _build_funds(rows, fields, returns):
+    converters = field_converters(fields)
+    plan = [(name, converters.get(name)) for name in fields]
+
+    results = []
+    with timed('serialize'):
+        for row in rows:
+            item = {}
+            for name, convert in plan:
+                if name == 'returns':
+                    item[name] = returns.get(row.id, {})
+                else:
+                    value = getattr(row, name)
+                    item[name] = convert(value) if convert is not None else value
+            results.append(item)
+    return results
+
+def project_funds(rows, fields):
+    """
+    Build FundSerializer-shaped dicts holding only fields from project_queryset rows,
+    without instantiating serializers or model instances.
+    """
+    rows = list(rows)
+    returns = fund_returns(row.id for row in rows) if 'returns' in fields else None
+    return _build_funds(rows, fields, returns)
+
+async def aproject_funds(rows, fields):
+    """project_funds for rows already fetched, loading returns through the async ORM"""
+    returns = await afund_returns(row.id for row in rows) if 'returns' in fields else None
+    return _build_funds(rows, fields, returns)
@@ -0,0 +1,153 @@
+
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .ingest_runs import count_retry
+from .parsers import READ_SIZE, JsonStreamParser
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 500
+REQUEST_TIMEOUT = 30
+
+class RateLimiter:
+    """Space out calls so no more than rate happen per second"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0
+        self._lock = threading.Lock()
+        self._next_call = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_call - now
+            self._next_call = max(now, self._next_call) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+class CountingRetry(Retry):
+    """Retry that counts each retry against the running ingest"""
+
+    def increment(self, *args, **kwargs):
+        # Raises instead when the retries are used up, so only actual retries are counted
+        retry = super().increment(*args, **kwargs)
+        count_retry()
+        return retry
+
+def build_session(retries=3, backoff=0.5, pool_size=4):
+    """HTTP session with pooled keep-alive connections and retry with exponential backoff"""
+    session = requests.Session()
+    retry = CountingRetry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=['GET'],
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def iter_provider_funds(provider, session=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Yield fund records from a provider page by page.
+
+    The provider serves GET {base_url}/funds?page=N&page_size=M and answers with
+    either a JSON list or an object with "results" and an optional "next" URL.
+    Responses are parsed as they arrive, so a page is never held in memory whole.
+    Paging stops at an empty page or when there is no next page.
+    """
+    session = session or build_session()
+    limiter = RateLimiter(provider.requests_per_second)
+    url = f"{provider.base_url.rstrip('/')}/funds"
+    params = {'page': 1, 'page_size': page_size}
+    headers = {'Authorization': f"Bearer {provider.api_key}"}
+
+    while url:
+        limiter.wait()
+        with session.get(
+            url, params=params, headers=headers, timeout=REQUEST_TIMEOUT, stream=True
+        ) as response:
+            response.raise_for_status()
+            parser = JsonStreamParser(response.iter_content(chunk_size=READ_SIZE))
+            count = 0
+            for record in parser:
+                count += 1
+                yield record
+
+        if not count:
+            return
+        next_url = parser.meta.get('next')
+        if next_url:
+            url, params = next_url, None
+        elif parser.container == '[' and count >= page_size:
+            params['page'] += 1
+        else:
+            return
+
+def stream_provider_funds(provider):
+    """Stream records from a single provider, closing its session when done"""
+    with build_session() as session:
+        yield from iter_provider_funds(provider, session=session)
+
+def fetch_provider(provider, session=None):
+    """Fetch every record from one provider into a list"""
+    started = time.monotonic()
+    records = list(iter_provider_funds(provider, session=session))
+    logger.info(
+        "Fetched %d funds from %s in %.2fs", len(records), provider.name, time.monotonic() - started
+    )
+    return records
+
+def _fetch_with_session(provider, session_factory):
+    with session_factory() as session:
+        return fetch_provider(provider, session=session)
+
+def merge_by_priority(results):
+    """
+    Merge (provider, records) pairs into one list deduplicated by scheme_code.
+    When providers disagree, the record from the provider with the lowest priority value wins.
+    """
+    merged = {}
+    for provider, records in sorted(results, key=lambda item: (item[0].priority, item[0].pk)):
+        for record in records:
+            merged.setdefault(record['scheme_code'], record)
+    return list(merged.values())
+
+def fetch_all_providers(providers, max_workers=None, session_factory=build_session):
+    """
+    Fetch from all providers concurrently, so wall-clock time tracks the slowest provider.
+    A failing provider is logged and skipped; returns None if every provider failed.
+    """
+    providers = list(providers)
+    if not providers:
+        return None
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max_workers or len(providers)) as executor:
+        # Each fetch runs in a copy of this context, so retries count against the ingest run
+        futures = {
+            executor.submit(contextvars.copy_context().run, _fetch_with_session, provider, session_factory): provider
+            for provider in providers
+        }
+        for future in as_completed(futures):
+            provider = futures[future]
+            try:
+                results.append((provider, future.result()))
+            except Exception as e:
+                logger.error("Error fetching from %s: %s", provider.name, e)
+
+    if not results:
+        return None
+    return merge_by_priority(results)
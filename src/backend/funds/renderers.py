@@ -0,0 +1,51 @@
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when it is installed.
+    Output matches the compact standard renderer; indented responses, and
+    anything orjson can't encode, go through the standard renderer.
+    """
+    encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            # Dates, Decimals and the like are handed to DRF's encoder so they render identically
+            ret = orjson.dumps(data, default=self.encoder.default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except (TypeError, orjson.JSONEncodeError):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped by the standard renderer for compatibility with JavaScript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+    def stream(self, data, chunk_size=100):
+        """
+        Render data in pieces, chunk_size items at a time for a top-level list or the
+        results list of a paginated response. The pieces join into exactly what render() returns.
+        """
+        if isinstance(data, dict) and list(data)[-1:] == ['results'] and isinstance(data['results'], list):
+            # Everything before the results list's opening bracket
+            prefix, items, suffix = self.render({**data, 'results': []})[:-len(b'[]}')], data['results'], b'}'
+        elif isinstance(data, list):
+            prefix, items, suffix = b'', data, b''
+        else:
+            yield self.render(data)
+            return
+
+        yield prefix + b'['
+        for start in range(0, len(items), chunk_size):
+            chunk = self.render(items[start:start + chunk_size])[1:-1]
+            yield chunk if start == 0 else b',' + chunk
+        yield b']' + suffix
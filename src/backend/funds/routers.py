@@ -0,0 +1,167 @@
+
+import contextvars
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'default'
+
+# Models always read from the primary: the data version decides stickiness itself, and
+# refresh jobs are polled right after being created
+PRIMARY_MODELS = ('funds.DataVersion', 'funds.RefreshJob')
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Set for the duration of a read-only request; anything else reads from the primary
+_replica_reads = contextvars.ContextVar('funds_replica_reads', default=None)
+
+@contextmanager
+def replica_reads():
+    """Allow reads in this block to go to replicas, until the block writes"""
+    token = _replica_reads.set({'enabled': True})
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica')]
+
+def replica_lag(alias):
+    """
+    Seconds the replica is behind its primary; 0 when it has replayed everything received.
+    Only PostgreSQL reports lag, other databases are just checked for a connection.
+    """
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        if connection.vendor != 'postgresql':
+            cursor.execute('SELECT 1')
+            return 0.0
+        cursor.execute(
+            "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+            "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+        )
+        return float(cursor.fetchone()[0])
+
+class ReplicaHealth:
+    """
+    Per-process health of the replicas, probed at most every REPLICA_HEALTH_INTERVAL seconds.
+    A replica that can't be reached, or lags more than REPLICA_MAX_LAG seconds, is skipped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked = {}
+        self._status = {}
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        with self._lock:
+            due = now - self._checked.get(alias, float('-inf')) >= settings.REPLICA_HEALTH_INTERVAL
+            if due:
+                # Claim the probe so concurrent readers keep using the last result
+                self._checked[alias] = now
+        if due:
+            self._status[alias] = self.probe(alias)
+        return self._status.get(alias, {}).get('healthy', False)
+
+    def probe(self, alias):
+        try:
+            lag = replica_lag(alias)
+        except DatabaseError as e:
+            logger.warning(f"Replica {alias} is unavailable: {e}")
+            return {'healthy': False, 'lag_seconds': None, 'error': str(e)}
+        healthy = lag <= settings.REPLICA_MAX_LAG
+        if not healthy:
+            logger.warning(f"Replica {alias} lags {lag:.1f}s behind the primary")
+        return {'healthy': healthy, 'lag_seconds': round(lag, 3), 'error': None}
+
+    def status(self):
+        """Last probe result per replica"""
+        return {alias: self._status.get(alias) for alias in replica_aliases()}
+
+health = ReplicaHealth()
+
+def recently_refreshed():
+    """Whether the last data refresh is too recent for the replicas to be trusted to have it"""
+    from .cache import get_data_stamp
+
+    updated_at = get_data_stamp()[1]
+    if updated_at is None:
+        return False
+    return (timezone.now() - updated_at).total_seconds() < settings.REPLICA_STICKY_SECONDS
+
+class ReplicaRouter:
+    """
+    Send reads from read-only requests to the replicas, each request to the next healthy one
+    in turn, and everything else to the primary. Reads stick to the primary once the request
+    writes, and for REPLICA_STICKY_SECONDS after each data refresh.
+    """
+
+    def __init__(self):
+        self._counter = itertools.count()
+
+    def db_for_read(self, model, **hints):
+        state = _replica_reads.get()
+        if state is None or not state['enabled'] or model._meta.label in PRIMARY_MODELS:
+            return PRIMARY
+        if 'alias' not in state:
+            # One database per request, so a page and its count come from the same snapshot
+            state['alias'] = self.choose_replica()
+        return state['alias']
+
+    def choose_replica(self):
+        """The next healthy replica in turn, or the primary when none is or data was just refreshed"""
+        if recently_refreshed():
+            return PRIMARY
+        healthy = [alias for alias in replica_aliases() if health.is_healthy(alias)]
+        if not healthy:
+            return PRIMARY
+        return healthy[next(self._counter) % len(healthy)]
+
+    def db_for_write(self, model, **hints):
+        state = _replica_reads.get()
+        if state is not None:
+            # Read your own writes for the rest of the request
+            state['enabled'] = False
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary
+        return db == PRIMARY
+
+class ReplicaRoutingMiddleware:
+    """Let GET, HEAD and OPTIONS requests read from the replicas"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if request.method not in SAFE_METHODS:
+            return self.get_response(request)
+        with replica_reads():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        if request.method not in SAFE_METHODS:
+            return await self.get_response(request)
+        with replica_reads():
+            return await self.get_response(request)
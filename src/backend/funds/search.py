@@ -0,0 +1,153 @@
+
+import re
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'funds_fund_fts'
+
+SQLITE_SEARCH_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        scheme_name, amc,
+        content='funds_fund', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON funds_fund BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, scheme_name, amc) VALUES (new.id, new.scheme_name, new.amc);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON funds_fund BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, scheme_name, amc)
+        VALUES ('delete', old.id, old.scheme_name, old.amc);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF scheme_name, amc ON funds_fund BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, scheme_name, amc)
+        VALUES ('delete', old.id, old.scheme_name, old.amc);
+        INSERT INTO {FTS_TABLE}(rowid, scheme_name, amc) VALUES (new.id, new.scheme_name, new.amc);
+    END
+    """,
+]
+
+POSTGRES_SEARCH_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS fund_name_trgm_idx ON funds_fund USING gin (scheme_name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS fund_amc_trgm_idx ON funds_fund USING gin (amc gin_trgm_ops)",
+]
+
+POSTGRES_DROP_SQL = [
+    "DROP INDEX IF EXISTS fund_name_trgm_idx",
+    "DROP INDEX IF EXISTS fund_amc_trgm_idx",
+    "DROP INDEX IF EXISTS fund_search_vector_idx",
+]
+
+def _search_vector():
+    from django.contrib.postgres.search import SearchVector
+    return SearchVector('scheme_name', 'amc', config='simple')
+
+def ensure_search_index(db):
+    """
+    Create the search structures for the current database vendor.
+    Safe to call repeatedly; on SQLite it also restores triggers dropped by table rebuilds.
+    """
+    if db.vendor == 'sqlite':
+        with db.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+                [f'{FTS_TABLE}_%']
+            )
+            triggers_missing = cursor.fetchone()[0] < 3
+            for statement in SQLITE_SEARCH_SQL:
+                cursor.execute(statement)
+            if triggers_missing:
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    elif db.vendor == 'postgresql':
+        from django.contrib.postgres.indexes import GinIndex
+        from funds.models import Fund
+
+        with db.cursor() as cursor:
+            for statement in POSTGRES_SEARCH_SQL:
+                cursor.execute(statement)
+            cursor.execute("SELECT 1 FROM pg_indexes WHERE indexname = 'fund_search_vector_idx'")
+            if cursor.fetchone() is None:
+                with db.schema_editor() as editor:
+                    editor.add_index(Fund, GinIndex(_search_vector(), name='fund_search_vector_idx'))
+
+def drop_search_index(db):
+    """Remove the search structures created by ensure_search_index"""
+    with db.cursor() as cursor:
+        if db.vendor == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+        elif db.vendor == 'postgresql':
+            for statement in POSTGRES_DROP_SQL:
+                cursor.execute(statement)
+
+def search_terms(search_query):
+    """Split a search string into lowercase word tokens"""
+    return re.findall(r'\w+', search_query.lower())
+
+def search_funds(queryset, search_query):
+    """
+    Filter funds matching search_query on scheme name or AMC, ranked by relevance.
+    Every term is matched as a prefix; on PostgreSQL trigram similarity also tolerates typos.
+    """
+    terms = search_terms(search_query)
+    if not terms:
+        return queryset
+
+    # The database the queryset reads from, which may be a replica
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        return _search_postgres(queryset, search_query, terms)
+    if connection.vendor == 'sqlite':
+        return _search_sqlite(queryset, connection, search_query, terms)
+    return _search_fallback(queryset, search_query)
+
+def _search_postgres(queryset, search_query, terms):
+    from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+
+    query = SearchQuery(
+        ' & '.join(f"{term}:*" for term in terms), config='simple', search_type='raw'
+    )
+    vector = _search_vector()
+    return queryset.annotate(
+        search_document=vector,
+        search_rank=SearchRank(vector, query) + TrigramWordSimilarity(search_query, 'scheme_name'),
+    ).filter(
+        Q(search_document=query) |
+        Q(scheme_name__trigram_word_similar=search_query) |
+        Q(amc__trigram_word_similar=search_query)
+    ).order_by('-search_rank', 'scheme_name', 'id')
+
+def _search_sqlite(queryset, connection, search_query, terms):
+    match = ' '.join(f'"{term}"*' for term in terms)
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT 1 FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s LIMIT 1", [match])
+        has_match = cursor.fetchone() is not None
+    if not has_match:
+        # FTS5 has no fuzzy matching; fall back to substring search
+        return _search_fallback(queryset, search_query)
+
+    # FTS5 rank is bm25, where lower is more relevant
+    return queryset.filter(
+        id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+    ).annotate(
+        search_rank=RawSQL(
+            f"SELECT rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = funds_fund.id",
+            [match]
+        )
+    ).order_by('search_rank', 'scheme_name', 'id')
+
+def _search_fallback(queryset, search_query):
+    return queryset.filter(
+        Q(scheme_name__icontains=search_query) |
+        Q(amc__icontains=search_query)
+    )
@@ -1,17 +1,36 @@
 
 from rest_framework import serializers
-from .models import Fund, FundReturn, DataProvider
+from .metrics import timed
+from .models import Fund, FundReturn, DataProvider, RefreshJob, IngestRun
+
+class TimedListSerializer(serializers.ListSerializer):
+    @property
+    def data(self):
+        with timed('serialize'):
+            return super().data
+
+class TimedModelSerializer(serializers.ModelSerializer):
+    """
+    ModelSerializer counting the time spent building .data as the request's serialize time.
+    Set list_serializer_class = TimedListSerializer in Meta to time many=True too.
+    """
+
+    @property
+    def data(self):
+        with timed('serialize'):
+            return super().data
 
 class FundReturnSerializer(serializers.ModelSerializer):
     class Meta:
         model = FundReturn
         fields = ['period', 'value', 'as_of_date']
 
-class FundSerializer(serializers.ModelSerializer):
+class FundSerializer(TimedModelSerializer):
     returns = serializers.SerializerMethodField()
     
     class Meta:
         model = Fund
+        list_serializer_class = TimedListSerializer
         fields = [
             'id', 'scheme_name', 'amc', 'scheme_code', 'nav', 
             'category', 'sub_category', 'expense_ratio', 'aum', 
@@ -29,8 +48,29 @@ class FundSerializer(serializers.ModelSerializer):
             result[return_item.period] = return_item.value
         return result
 
-class DataProviderSerializer(serializers.ModelSerializer):
+class DataProviderSerializer(TimedModelSerializer):
     class Meta:
         model = DataProvider
-        fields = ['id', 'name', 'base_url', 'is_active']
+        list_serializer_class = TimedListSerializer
+        fields = ['id', 'name', 'base_url', 'is_active', 'priority', 'requests_per_second']
         # Note: We don't include api_key in responses for security reasons
+
+class RefreshJobSerializer(TimedModelSerializer):
+    class Meta:
+        model = RefreshJob
+        list_serializer_class = TimedListSerializer
+        fields = [
+            'id', 'status', 'funds_processed', 'funds_total', 'result',
+            'error', 'created_at', 'started_at', 'finished_at'
+        ]
+
+class IngestRunSerializer(TimedModelSerializer):
+    class Meta:
+        model = IngestRun
+        list_serializer_class = TimedListSerializer
+        fields = [
+            'id', 'source', 'status', 'refresh_job', 'started_at', 'finished_at',
+            'duration_seconds', 'stage_seconds', 'records_read', 'records_per_second',
+            'records_failed', 'failure_reasons', 'db_queries', 'db_seconds', 'http_retries',
+            'result', 'error', 'profile_file'
+        ]
@@ -0,0 +1,133 @@
+
+import threading
+
+import numpy as np
+from rest_framework.exceptions import ValidationError
+
+from .cache import get_data_version
+from .filters import NUMERIC_FIELDS, RETURN_PREFIX, parse_ordering, parse_range_filters
+from .models import Fund, FundReturn
+
+STRING_FIELDS = ['scheme_name', 'category', 'amc']
+
+# Screens using any of these fall back to the database
+UNSUPPORTED_PARAMS = ('fundIds', 'searchQuery')
+
+def _float_column(values):
+    return np.array([np.nan if value is None else float(value) for value in values], dtype=np.float64)
+
+class FundSnapshot:
+    """
+    Read-only column arrays of the whole fund universe for one data version.
+    Screens are evaluated as boolean masks over the columns, without touching the database.
+    """
+
+    def __init__(self, version, ids, columns, name_rank):
+        self.version = version
+        self.ids = ids
+        self.columns = columns
+        # Position of each fund in the default list order: scheme name, then id
+        self.name_rank = name_rank
+        self.name_order = np.argsort(name_rank)
+        for array in (self.ids, self.name_order, self.name_rank, *self.columns.values()):
+            array.flags.writeable = False
+
+    @classmethod
+    def load(cls, version):
+        fields = ['id', *STRING_FIELDS, *NUMERIC_FIELDS]
+        # Names are ranked by the database, so the order follows its collation as the list does
+        rows = list(Fund.objects.order_by('scheme_name', 'id').values_list(*fields))
+        values = dict(zip(fields, zip(*rows))) if rows else {field: () for field in fields}
+
+        # Columns are kept in id order; name_rank[i] is where the fund at i came in name order
+        name_rank = np.argsort(np.array(values['id'], dtype=np.int64), kind='stable')
+        ids = np.array(values['id'], dtype=np.int64)[name_rank]
+        columns = {field: np.array(values[field], dtype=object)[name_rank] for field in STRING_FIELDS}
+        columns.update({field: _float_column(values[field])[name_rank] for field in NUMERIC_FIELDS})
+
+        returns = list(FundReturn.objects.values_list('fund_id', 'period', 'value'))
+        if returns and len(ids):
+            fund_ids, periods, return_values = zip(*returns)
+            fund_ids = np.array(fund_ids, dtype=np.int64)
+            periods = np.array(periods, dtype=object)
+            return_values = _float_column(return_values)
+            positions = np.minimum(np.searchsorted(ids, fund_ids), len(ids) - 1)
+            # Funds added between the two queries are left out
+            known = ids[positions] == fund_ids
+            for period in set(periods[known]):
+                selected = known & (periods == period)
+                column = np.full(len(ids), np.nan)
+                column[positions[selected]] = return_values[selected]
+                columns[f'{RETURN_PREFIX}{period}'] = column
+        return cls(version, ids, columns, name_rank)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def screen(self, params):
+        """
+        Ids of the funds matching the list filters in params, in the requested order.
+        Returns None when params use a filter the snapshot can't evaluate, or are
+        invalid, so the database path handles (and reports) them.
+        """
+        if any(params.get(name) for name in UNSUPPORTED_PARAMS):
+            return None
+        try:
+            ranges = parse_range_filters(params)
+            ordering = parse_ordering(params.get('ordering'))
+        except ValidationError:
+            return None
+
+        mask = np.ones(len(self.ids), dtype=bool)
+        for name in ('category', 'amc'):
+            value = params.get(name)
+            if value:
+                mask &= self.columns[name] == value
+
+        empty = np.full(len(self.ids), np.nan)
+        with np.errstate(invalid='ignore'):
+            for field, lookup, value in ranges:
+                compare = np.greater_equal if lookup == 'gte' else np.less_equal
+                mask &= compare(self.columns.get(field, empty), float(value))
+        # As on the database path, funds without a return period used are left out
+        for name, _ in ordering or []:
+            if name.startswith(RETURN_PREFIX):
+                mask &= ~np.isnan(self.columns.get(name, empty))
+
+        if not ordering:
+            return self.ids[self.name_order[mask[self.name_order]]]
+        return self._sorted_ids(np.flatnonzero(mask), ordering)
+
+    def _sorted_ids(self, positions, ordering):
+        """Sort positions by the ordering keys with the id tie-breaker; missing values go last"""
+        ids = self.ids[positions]
+        if not len(ids):
+            return ids
+        # np.lexsort treats its last key as the primary one
+        keys = [-ids if ordering[0][1] else ids]
+        for name, descending in reversed(ordering):
+            if name == 'scheme_name':
+                values = self.name_rank[positions].astype(np.float64)
+            else:
+                values = self.columns[name][positions]
+            keys.append(-values if descending else values)
+            keys.append(np.isnan(values))
+        return ids[np.lexsort(keys)]
+
+_current = None
+_lock = threading.Lock()
+
+def get_snapshot():
+    """
+    The snapshot for the current data version, rebuilt once per version change.
+    Readers keep whichever snapshot they got; a rebuild swaps in a new object.
+    """
+    global _current
+    version = get_data_version()
+    snapshot = _current
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    with _lock:
+        if _current is None or _current.version != version:
+            _current = FundSnapshot.load(version)
+        return _current
@@ -0,0 +1,67 @@
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+
+from .models import METRIC_FIELDS, Fund, MetricSnapshot
+
+# Fields summarized for the screener sliders
+SUMMARY_FIELDS = [*METRIC_FIELDS, 'expense_ratio', 'aum']
+
+HISTOGRAM_BUCKETS = 10
+
+def _round(value):
+    return round(float(value), 4)
+
+def summarize_metric(values):
+    """Summarize a series of metric values into min/max/avg, percentiles and a histogram"""
+    values = values.dropna().astype(float).to_numpy()
+    if not len(values):
+        return None
+
+    counts, edges = np.histogram(values, bins=HISTOGRAM_BUCKETS)
+    p10, p50, p90 = np.percentile(values, [10, 50, 90])
+    return {
+        'min': _round(values.min()),
+        'max': _round(values.max()),
+        'avg': _round(values.mean()),
+        'p10': _round(p10),
+        'p50': _round(p50),
+        'p90': _round(p90),
+        'histogram': {
+            'edges': [_round(edge) for edge in edges],
+            'counts': counts.tolist(),
+        },
+    }
+
+def summarize_group(frame):
+    """Summarize every metric for a group of funds"""
+    return {field: summarize_metric(frame[field]) for field in SUMMARY_FIELDS}
+
+def compute_metric_snapshots():
+    """Compute snapshots for all funds, each category and each (category, sub_category) pair"""
+    rows = Fund.objects.values('category', 'sub_category', *SUMMARY_FIELDS)
+    frame = pd.DataFrame.from_records(rows, columns=['category', 'sub_category', *SUMMARY_FIELDS])
+    frame['sub_category'] = frame['sub_category'].fillna('')
+
+    snapshots = [MetricSnapshot(fund_count=len(frame), stats=summarize_group(frame))]
+    for category, group in frame.groupby('category'):
+        snapshots.append(MetricSnapshot(
+            category=category, fund_count=len(group), stats=summarize_group(group)
+        ))
+    for (category, sub_category), group in frame.groupby(['category', 'sub_category']):
+        if not sub_category:
+            continue
+        snapshots.append(MetricSnapshot(
+            category=category, sub_category=sub_category,
+            fund_count=len(group), stats=summarize_group(group)
+        ))
+    return snapshots
+
+def refresh_metric_snapshots():
+    """Replace the stored metric snapshots with freshly computed ones"""
+    snapshots = compute_metric_snapshots()
+    with transaction.atomic():
+        MetricSnapshot.objects.all().delete()
+        MetricSnapshot.objects.bulk_create(snapshots)
+    return len(snapshots)
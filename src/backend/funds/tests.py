@@ -0,0 +1,319 @@
+
+import os
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.pagination import PageNumberPagination
+
+from . import navstore
+from .ingest_runs import count_retry, record_run
+from .cache import bump_data_version, get_data_stamp
+from .materialized import refresh_materialized_data
+from .models import (
+    DataProvider, Fund, FundCategory, FundNav, FundReturn, IngestRun, JobStatus, LeaderboardEntry, MetricSnapshot,
+    RefreshJob,
+)
+from .providers import fetch_all_providers, merge_by_priority
+from .routers import PRIMARY, ReplicaRouter, replica_reads
+from .snapshot import FundSnapshot
+from .views import FundViewSet
+
+FUND_COUNT = 30
+PAGE_SIZES = (1, 10, FUND_COUNT)
+
+class FundListQueryCountTests(TestCase):
+    """The fund list makes the same number of queries however many funds a page holds"""
+
+    @classmethod
+    def setUpTestData(cls):
+        funds = Fund.objects.bulk_create(
+            Fund(
+                scheme_name=f'Fund {index:02d}', amc=f'AMC {index % 3}', scheme_code=f'SCH{index:04d}',
+                nav=Decimal('10.5'), category=FundCategory.EQUITY, expense_ratio=Decimal('1.25'),
+                aum=Decimal('1000'), inception_date=date(2015, 1, 1), sharpe_ratio=Decimal('0.8'),
+            )
+            for index in range(FUND_COUNT)
+        )
+        FundReturn.objects.bulk_create(
+            FundReturn(fund=fund, period=period, value=Decimal('12.5'), as_of_date=date(2024, 1, 1))
+            for fund in funds
+            for period in ('1Y', '3Y', '5Y')
+        )
+
+    def assert_list_queries(self, num, params=None):
+        for page_size in PAGE_SIZES:
+            with self.subTest(page_size=page_size), mock.patch.object(PageNumberPagination, 'page_size', page_size):
+                # Responses are cached per data version; start each request cold but for the version
+                cache.clear()
+                get_data_stamp()
+                with self.assertNumQueries(num):
+                    response = self.client.get('/api/funds/', params)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()['results']), page_size)
+
+    def test_list(self):
+        self.assert_list_queries(3)
+
+    def test_list_with_fields(self):
+        self.assert_list_queries(3, {'fields': 'id,scheme_name,nav,returns'})
+
+    def test_list_filtered_and_ordered(self):
+        self.assert_list_queries(3, {'category': 'Equity', 'minSharpeRatio': '0.5', 'ordering': '-returns_3Y'})
+
+    def test_list_with_serializer(self):
+        with mock.patch.object(FundViewSet, 'fast_serialization', False):
+            self.assert_list_queries(3)
+
+class FundDetailTests(TestCase):
+
+    def test_non_integer_pk_is_not_found(self):
+        for url in ('/api/funds/abc/', '/api/funds/abc/nav/', '/api/funds/abc/?fields=id,nav'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+class ConditionalResponseTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_errors_carry_no_validators(self):
+        refresh_materialized_data()
+        response = self.client.get('/api/metrics-stats/', {'category': 'Nope'})
+        self.assertEqual(response.status_code, 404)
+        for header in ('ETag', 'Last-Modified', 'Cache-Control'):
+            self.assertFalse(response.has_header(header), header)
+
+    def test_successful_responses_revalidate(self):
+        response = self.client.get('/api/funds/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('max-age', response['Cache-Control'])
+        response = self.client.get('/api/funds/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+@override_settings(REFRESH_WORKER_MODE='external', REFRESH_QUEUE_TIMEOUT=600)
+class RefreshQueueTests(TestCase):
+
+    def test_unclaimed_job_is_failed_and_a_new_one_queued(self):
+        stale = RefreshJob.objects.create()
+        RefreshJob.objects.filter(pk=stale.pk).update(created_at=timezone.now() - timedelta(seconds=601))
+
+        response = self.client.post('/api/refresh-data/')
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(response.json()['created'])
+        self.assertNotEqual(response.json()['id'], stale.pk)
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, JobStatus.FAILED)
+        self.assertIn('No worker', stale.error)
+
+    def test_recent_queued_job_is_shared(self):
+        queued = RefreshJob.objects.create()
+        response = self.client.post('/api/refresh-data/')
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(response.json()['created'])
+        self.assertEqual(response.json()['id'], queued.pk)
+
+class MaterializedReadTests(TestCase):
+    """Statistics and leaderboards are built at ingest, never by the GET requests reading them"""
+
+    def setUp(self):
+        cache.clear()
+        Fund.objects.create(
+            scheme_name='Fund', amc='AMC', scheme_code='SCH0001', nav=Decimal('11'), expense_ratio=Decimal('1.25'),
+            aum=Decimal('100'), inception_date=date(2015, 1, 1), beta=Decimal('0.95'),
+        )
+
+    def test_empty_before_first_ingest(self):
+        response = self.client.get('/api/metrics-stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['fund_count'], 0)
+        self.assertIsNone(response.json()['min_beta'])
+        self.assertEqual(self.client.get('/api/top-funds/', {'metric': 'beta'}).json(), [])
+        self.assertFalse(MetricSnapshot.objects.exists())
+        self.assertFalse(LeaderboardEntry.objects.exists())
+
+    def test_flat_stats_keep_the_aggregate_types(self):
+        refresh_materialized_data()
+        response = self.client.get('/api/metrics-stats/')
+        self.assertIsInstance(response.data['min_beta'], Decimal)
+        self.assertEqual(response.json()['min_beta'], 0.95)
+
+class SipReturnsTests(TestCase):
+
+    def test_rejects_amounts_that_are_not_positive_finite_numbers(self):
+        for amount in ('nan', 'inf', '-inf', '1e400', '0', '-5', 'abc'):
+            with self.subTest(amount=amount):
+                response = self.client.get('/api/calculators/sip/', {'ids': '1', 'amount': amount, 'from': '2021-01-01'})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('amount', response.json())
+
+class NavCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        cache_dir_setting = override_settings(NAV_CACHE_DIR=self.cache_dir.name)
+        cache_dir_setting.enable()
+        self.addCleanup(cache_dir_setting.disable)
+        self.fund = Fund.objects.create(
+            scheme_name='Fund', amc='AMC', scheme_code='SCH0001', nav=Decimal('11'), expense_ratio=Decimal('1'),
+            aum=Decimal('100'), inception_date=date(2015, 1, 1),
+        )
+        FundNav.objects.create(fund=self.fund, date=date(2024, 1, 1), nav=Decimal('10'))
+
+    def test_files_are_rebuilt_after_the_data_version_changes(self):
+        self.assertEqual(len(navstore.load_log_series(self.fund.pk)), 1)
+
+        # Written without the local invalidation, as by an ingest in another process
+        FundNav.objects.create(fund=self.fund, date=date(2024, 1, 2), nav=Decimal('11'))
+        self.assertEqual(len(navstore.load_log_series(self.fund.pk)), 1)
+        bump_data_version()
+
+        self.assertEqual(navstore.load_nav_series(self.fund.pk)[:, 1].tolist(), [10.0, 11.0])
+        self.assertEqual(len(navstore.load_log_series(self.fund.pk)), 2)
+        self.assertEqual(len(os.listdir(self.cache_dir.name)), 2)
+
+class FakeResponse:
+
+    def __init__(self, body):
+        self.body = body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size=None):
+        yield self.body
+
+class FakeSession:
+    """Serves one page per provider, retrying each request the given number of times first"""
+
+    def __init__(self, pages, retries=0):
+        self.pages = pages
+        self.retries = retries
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def get(self, url, **kwargs):
+        for _ in range(self.retries):
+            # Stands in for urllib3 calling CountingRetry.increment
+            count_retry()
+        return FakeResponse(self.pages[url])
+
+class ProviderFetchTests(TestCase):
+
+    def setUp(self):
+        self.primary = DataProvider.objects.create(
+            name='Primary', api_key='key', base_url='http://primary.test', priority=1, requests_per_second=0,
+        )
+        self.fallback = DataProvider.objects.create(
+            name='Fallback', api_key='key', base_url='http://fallback.test', priority=2, requests_per_second=0,
+        )
+
+    def test_merge_prefers_the_lowest_priority_value(self):
+        merged = merge_by_priority([
+            (self.fallback, [{'scheme_code': 'A', 'nav': 2}, {'scheme_code': 'B', 'nav': 2}]),
+            (self.primary, [{'scheme_code': 'A', 'nav': 1}]),
+        ])
+        self.assertEqual(sorted((record['scheme_code'], record['nav']) for record in merged), [('A', 1), ('B', 2)])
+
+    def test_retries_in_fetch_threads_count_against_the_run(self):
+        pages = {
+            'http://primary.test/funds': b'[{"scheme_code": "A", "nav": 1}]',
+            'http://fallback.test/funds': b'{"results": [{"scheme_code": "A", "nav": 2}, {"scheme_code": "B", "nav": 2}]}',
+        }
+        with record_run('test') as recorder:
+            records = fetch_all_providers(
+                [self.fallback, self.primary], session_factory=lambda: FakeSession(pages, retries=2),
+            )
+        self.assertEqual(sorted((record['scheme_code'], record['nav']) for record in records), [('A', 1), ('B', 2)])
+        self.assertEqual(recorder.retries, 4)
+        self.assertEqual(IngestRun.objects.get(pk=recorder.run.pk).http_retries, 4)
+
+    def test_failing_provider_is_skipped(self):
+        pages = {'http://primary.test/funds': b'[{"scheme_code": "A", "nav": 1}]'}
+        records = fetch_all_providers([self.primary, self.fallback], session_factory=lambda: FakeSession(pages))
+        self.assertEqual(records, [{'scheme_code': 'A', 'nav': 1}])
+
+@override_settings(REPLICA_STICKY_SECONDS=60)
+class ReplicaRouterTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.router = ReplicaRouter()
+        for patcher in (
+            mock.patch('funds.routers.replica_aliases', return_value=['replica1']),
+            mock.patch('funds.routers.health.is_healthy', return_value=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_reads_go_to_the_primary_outside_read_only_requests(self):
+        self.assertEqual(self.router.db_for_read(Fund), PRIMARY)
+
+    def test_reads_stick_to_the_primary_after_a_write(self):
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Fund), 'replica1')
+            self.assertEqual(self.router.db_for_write(Fund), PRIMARY)
+            self.assertEqual(self.router.db_for_read(Fund), PRIMARY)
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Fund), 'replica1')
+
+    def test_reads_stick_to_the_primary_after_a_refresh(self):
+        bump_data_version()
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Fund), PRIMARY)
+
+        with override_settings(REPLICA_STICKY_SECONDS=0), replica_reads():
+            self.assertEqual(self.router.db_for_read(Fund), 'replica1')
+
+    def test_primary_models_never_read_from_replicas(self):
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(RefreshJob), PRIMARY)
+
+class FundSnapshotOrderTests(TestCase):
+    """The in-memory screen lists funds in the same order as the database path"""
+
+    def setUp(self):
+        cache.clear()
+        # Every test starts at data version 0, so don't reuse another test's snapshot
+        patcher = mock.patch('funds.snapshot._current', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Mixed case, accents and repeated names, created out of name order
+        for index, name in enumerate(['banana', 'Apple', 'Éclair', 'apple', 'Banana', 'Apple', 'cherry', 'Zebra']):
+            Fund.objects.create(
+                scheme_name=name, amc='AMC', scheme_code=f'SCH{index:04d}', nav=Decimal('10'),
+                category=FundCategory.EQUITY if index % 4 else FundCategory.DEBT, expense_ratio=Decimal('1'),
+                aum=Decimal(100 + index), inception_date=date(2015, 1, 1),
+            )
+
+    def test_default_order_matches_the_database(self):
+        snapshot = FundSnapshot.load(get_data_stamp()[0])
+        for params in ({}, {'category': FundCategory.EQUITY}):
+            with self.subTest(params=params):
+                expected = list(Fund.objects.filter(**params).order_by('scheme_name', 'id').values_list('id', flat=True))
+                self.assertEqual(snapshot.screen(params).tolist(), expected)
+
+    def test_list_matches_with_and_without_the_snapshot(self):
+        params = {'category': FundCategory.EQUITY, 'fields': 'id'}
+        with override_settings(FUND_SNAPSHOT_ENABLED=False):
+            expected = self.client.get('/api/funds/', params).json()['results']
+        self.assertEqual(len(expected), 6)
+        cache.clear()
+        with override_settings(FUND_SNAPSHOT_ENABLED=True):
+            self.assertEqual(self.client.get('/api/funds/', params).json()['results'], expected)
@@ -1,16 +1,32 @@
 
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import async_views, views
 
 router = DefaultRouter()
 router.register(r'funds', views.FundViewSet, basename='fund')
 router.register(r'data-providers', views.DataProviderViewSet)
+router.register(r'ingest-runs', views.IngestRunViewSet, basename='ingest-run')
 
 urlpatterns = [
     path('', include(router.urls)),
     path('top-funds/', views.get_top_performing_funds, name='top-funds'),
     path('refresh-data/', views.refresh_fund_data, name='refresh-data'),
+    path('refresh-jobs/<int:job_id>/', views.get_refresh_job, name='refresh-job'),
     path('amcs/', views.get_all_amcs, name='all-amcs'),
+    path('calculators/rolling-returns/', views.get_rolling_returns, name='rolling-returns'),
+    path('calculators/sip/', views.get_sip_returns, name='sip-returns'),
     path('metrics-stats/', views.get_advanced_metrics_stats, name='metrics-stats'),
+    path('health/db/', views.get_database_health, name='database-health'),
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    # Matched before the DRF views at the same URLs
+    urlpatterns = [
+        path('funds/', async_views.fund_list, name='async-fund-list'),
+        path('funds/<int:pk>/', async_views.fund_detail, name='async-fund-detail'),
+        path('top-funds/', async_views.top_funds, name='async-top-funds'),
+        path('amcs/', async_views.all_amcs, name='async-all-amcs'),
+        path('metrics-stats/', async_views.metrics_stats, name='async-metrics-stats'),
+    ] + urlpatterns
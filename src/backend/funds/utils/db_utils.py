@@ -1,34 +1,124 @@
 
+import logging
+import threading
+import time
+import weakref
+
 from django.db import connections
+from django.db.backends.signals import connection_created
 from django.db.utils import OperationalError
-import logging
+
+from .. import metrics
 
 logger = logging.getLogger(__name__)
 
-def check_database_connection():
+def check_database_connection(alias='default'):
     """
     Check if the database connection is working.
+    Reuses the thread's persistent connection, replacing it first if it has gone bad.
     Returns True if connected, False otherwise.
     """
+    connection = connections[alias]
     try:
-        connections['default'].cursor()
+        connection.close_if_unusable_or_obsolete()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
         return True
     except OperationalError:
         logger.error("Database connection failed")
         return False
 
-def get_connection_info():
+def get_connection_info(alias='default'):
     """
     Get information about the current database connection.
     """
     try:
-        db_settings = connections['default'].settings_dict
+        db_settings = connections[alias].settings_dict
         return {
             'engine': db_settings['ENGINE'].split('.')[-1],
-            'name': db_settings['NAME'],
-            'host': db_settings.get('HOST', 'local'),
-            'port': db_settings.get('PORT', 'default')
+            'name': str(db_settings['NAME']),
+            'host': db_settings.get('HOST') or 'local',
+            'port': db_settings.get('PORT') or 'default',
+            'conn_max_age': db_settings.get('CONN_MAX_AGE'),
+            'conn_health_checks': db_settings.get('CONN_HEALTH_CHECKS'),
         }
     except Exception as e:
         logger.error(f"Error getting database info: {str(e)}")
         return None
+
+# Connection statistics for this process. Django keeps one connection per thread and
+# alias, so every DatabaseWrapper that has connected is tracked here.
+_lock = threading.Lock()
+_wrappers = weakref.WeakSet()
+_totals = {}
+
+def _alias_totals(alias):
+    return _totals.setdefault(alias, {
+        'created': 0, 'connects': 0, 'connect_seconds': 0.0, 'connect_max_seconds': 0.0,
+    })
+
+def record_connect_time(alias, seconds):
+    """Record how long an attempt to open a connection took"""
+    with _lock:
+        totals = _alias_totals(alias)
+        totals['connects'] += 1
+        totals['connect_seconds'] += seconds
+        totals['connect_max_seconds'] = max(totals['connect_max_seconds'], seconds)
+
+class ConnectTimingMixin:
+    """DatabaseWrapper mixin timing every new connection; see the funds.backends engines"""
+
+    def get_new_connection(self, conn_params):
+        started = time.perf_counter()
+        try:
+            return super().get_new_connection(conn_params)
+        finally:
+            record_connect_time(self.alias, time.perf_counter() - started)
+
+def _track_queries(execute, sql, params, many, context):
+    wrapper = context['connection']
+    wrapper.executing_queries = getattr(wrapper, 'executing_queries', 0) + 1
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        wrapper.executing_queries -= 1
+        metrics.record_query(time.perf_counter() - started)
+
+def _connection_created(sender, connection, **kwargs):
+    with _lock:
+        _alias_totals(connection.alias)['created'] += 1
+        if connection not in _wrappers:
+            _wrappers.add(connection)
+            connection.execute_wrappers.append(_track_queries)
+
+def install_connection_tracking():
+    """Start collecting connection statistics; called once from FundsConfig.ready"""
+    connection_created.connect(_connection_created, dispatch_uid='funds.connection_tracking')
+
+def get_connection_stats():
+    """
+    Connection statistics per alias for this process: open connections, how many are in use
+    (running a query or holding a transaction) or idle, and the time spent opening connections.
+    """
+    with _lock:
+        wrappers = list(_wrappers)
+        totals = {alias: dict(values) for alias, values in _totals.items()}
+
+    stats = {}
+    for alias, values in totals.items():
+        open_wrappers = [wrapper for wrapper in wrappers if wrapper.alias == alias and wrapper.connection is not None]
+        in_use = sum(
+            1 for wrapper in open_wrappers
+            if getattr(wrapper, 'executing_queries', 0) or wrapper.in_atomic_block
+        )
+        connects = values['connects']
+        stats[alias] = {
+            'open': len(open_wrappers),
+            'in_use': in_use,
+            'idle': len(open_wrappers) - in_use,
+            'created': values['created'],
+            'connect_wait_ms_avg': round(values['connect_seconds'] / connects * 1000, 2) if connects else None,
+            'connect_wait_ms_max': round(values['connect_max_seconds'] * 1000, 2),
+        }
+    return stats
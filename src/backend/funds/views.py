@@ -1,148 +1,355 @@
 
 from rest_framework import viewsets
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.permissions import AllowAny
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
-from django.db.models import Q
-from .models import Fund, DataProvider
-from .serializers import FundSerializer, DataProviderSerializer
-import sys
-import os
-from django.http import JsonResponse
-from datetime import datetime
-
-class FundViewSet(viewsets.ReadOnlyModelViewSet):
+from .models import Fund, DataProvider, IngestRun, MetricSnapshot, RefreshJob
+from .serializers import FundSerializer, DataProviderSerializer, IngestRunSerializer, RefreshJobSerializer
+from .cache import CachedResponseMixin, cached_response, conditional_response
+from .stats import SUMMARY_FIELDS
+from .filters import filter_funds
+from .snapshot import get_snapshot
+from .renderers import FastJSONRenderer
+from .pagination import KeysetPagination, use_cursor_pagination
+from .jobs import enqueue_refresh
+from . import calculators, leaderboards, metrics, navstore, projection, routers
+from .utils import db_utils
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.conf import settings
+from datetime import date
+from decimal import Decimal
+import math
+
+# Largest number of funds one comparison may cover
+MAX_COMPARE_FUNDS = 10
+
+class FundViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = FundSerializer
+    cache_prefix = 'funds'
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    # Build list and detail rows from values() instead of FundSerializer; ?fields= always does
+    fast_serialization = True
+
+    @property
+    def paginator(self):
+        """Use keyset pagination when the client opts in, page numbers otherwise"""
+        if not hasattr(self, '_paginator'):
+            if use_cursor_pagination(self.request):
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = self.pagination_class() if self.pagination_class else None
+        return self._paginator
     
     def get_queryset(self):
-        queryset = Fund.objects.all()
-        
-        # Filter by specific fund IDs
-        fund_ids = self.request.query_params.get('fundIds')
-        if fund_ids:
-            fund_ids = fund_ids.split(',')
-            queryset = queryset.filter(scheme_code__in=fund_ids)
-            return queryset
-            
-        # Apply other filters
-        category = self.request.query_params.get('category')
-        amc = self.request.query_params.get('amc')
-        search_query = self.request.query_params.get('searchQuery')
-        
-        if category:
-            queryset = queryset.filter(category=category)
-        if amc:
-            queryset = queryset.filter(amc=amc)
-        if search_query:
-            queryset = queryset.filter(
-                Q(scheme_name__icontains=search_query) |
-                Q(amc__icontains=search_query)
-            )
-            
-        # Apply advanced metric filters
-        min_standard_deviation = self.request.query_params.get('minStandardDeviation')
-        max_standard_deviation = self.request.query_params.get('maxStandardDeviation')
-        min_sharpe_ratio = self.request.query_params.get('minSharpeRatio')
-        max_sharpe_ratio = self.request.query_params.get('maxSharpeRatio')
-        min_treynor_ratio = self.request.query_params.get('minTreynorRatio')
-        max_treynor_ratio = self.request.query_params.get('maxTreynorRatio')
-        min_beta = self.request.query_params.get('minBeta')
-        max_beta = self.request.query_params.get('maxBeta')
-        min_alpha = self.request.query_params.get('minAlpha')
-        max_alpha = self.request.query_params.get('maxAlpha')
-        
-        if min_standard_deviation:
-            queryset = queryset.filter(standard_deviation__gte=float(min_standard_deviation))
-        if max_standard_deviation:
-            queryset = queryset.filter(standard_deviation__lte=float(max_standard_deviation))
-        if min_sharpe_ratio:
-            queryset = queryset.filter(sharpe_ratio__gte=float(min_sharpe_ratio))
-        if max_sharpe_ratio:
-            queryset = queryset.filter(sharpe_ratio__lte=float(max_sharpe_ratio))
-        if min_treynor_ratio:
-            queryset = queryset.filter(treynor_ratio__gte=float(min_treynor_ratio))
-        if max_treynor_ratio:
-            queryset = queryset.filter(treynor_ratio__lte=float(max_treynor_ratio))
-        if min_beta:
-            queryset = queryset.filter(beta__gte=float(min_beta))
-        if max_beta:
-            queryset = queryset.filter(beta__lte=float(max_beta))
-        if min_alpha:
-            queryset = queryset.filter(alpha__gte=float(min_alpha))
-        if max_alpha:
-            queryset = queryset.filter(alpha__lte=float(max_alpha))
-            
-        return queryset
+        return filter_funds(Fund.objects.prefetch_related('returns_data'), self.request.query_params)
+
+    def use_fast_path(self, request):
+        return self.fast_serialization or 'fields' in request.query_params
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_fast_path(request):
+            return super().list(request, *args, **kwargs)
+        return cached_response(f"{self.cache_prefix}-list")(self._projected_list)(request)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.use_fast_path(request):
+            return super().retrieve(request, *args, **kwargs)
+        return cached_response(f"{self.cache_prefix}-detail")(self._projected_retrieve)(request, **kwargs)
+
+    def _requested_fields(self, request):
+        return projection.parse_fields(request.query_params.get('fields')) or projection.FUND_FIELDS
+
+    def _projected_list(self, request):
+        """List the requested fields, built from values() rows instead of FundSerializer"""
+        fields = self._requested_fields(request)
+        if settings.FUND_SNAPSHOT_ENABLED and not use_cursor_pagination(request):
+            fund_ids = get_snapshot().screen(request.query_params)
+            if fund_ids is not None:
+                return self._snapshot_list(fund_ids, fields)
+
+        queryset = projection.project_queryset(self.filter_queryset(self.get_queryset()), fields)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(projection.project_funds(page, fields))
+        return Response(projection.project_funds(queryset, fields))
+
+    def _snapshot_list(self, fund_ids, fields):
+        """Paginate ids screened in memory, then load only that page's rows by primary key"""
+        page = self.paginate_queryset(fund_ids.tolist())
+        page_ids = page if page is not None else fund_ids.tolist()
+        rows = {
+            row.id: row
+            for row in projection.project_queryset(Fund.objects.filter(pk__in=page_ids), fields)
+        }
+        data = projection.project_funds([rows[fund_id] for fund_id in page_ids if fund_id in rows], fields)
+        return self.get_paginated_response(data) if page is not None else Response(data)
+
+    def _projected_retrieve(self, request, **kwargs):
+        fields = self._requested_fields(request)
+        row = get_object_or_404(projection.project_queryset(Fund.objects.all(), fields), pk=kwargs['pk'])
+        return Response(projection.project_funds([row], fields)[0])
+
+    @action(detail=False, methods=['get'], url_path='compare')
+    @method_decorator(conditional_response('funds-compare'))
+    def compare(self, request):
+        """Side-by-side data for a few funds, e.g. ?ids=1,2,3&fields=scheme_name,nav,returns"""
+        try:
+            ids = [int(value) for value in request.query_params.get('ids', '').split(',') if value]
+        except ValueError:
+            raise ValidationError({"ids": "ids must be a comma-separated list of fund ids"})
+        if not ids:
+            raise ValidationError({"ids": "At least one fund id is required"})
+        if len(ids) > MAX_COMPARE_FUNDS:
+            raise ValidationError({"ids": f"At most {MAX_COMPARE_FUNDS} funds can be compared"})
+
+        fields = self._requested_fields(request)
+        if 'id' not in fields:
+            fields = ['id', *fields]
+        rows = {row.id: row for row in projection.project_queryset(Fund.objects.filter(pk__in=ids), fields)}
+        # Keep the order the funds were asked for
+        ordered = [rows[fund_id] for fund_id in dict.fromkeys(ids) if fund_id in rows]
+        return Response(projection.project_funds(ordered, fields))
+
+    @action(detail=True, methods=['get'], url_path='nav')
+    @method_decorator(conditional_response('funds-nav'))
+    def nav(self, request, pk=None):
+        """NAV history for a date range, optionally downsampled with resample=W|M|Q|Y|auto"""
+        fund = get_object_or_404(Fund.objects.only('id', 'scheme_code'), pk=pk)
+        try:
+            start = navstore.parse_date(request.query_params.get('from'))
+            end = navstore.parse_date(request.query_params.get('to'))
+        except ValueError:
+            return Response({"detail": "from and to must be YYYY-MM-DD dates"}, status=400)
+
+        rule = request.query_params.get('resample', 'D').upper()
+        if rule not in ('D', 'AUTO', *navstore.RESAMPLE_RULES):
+            return Response({"detail": "resample must be one of D, W, M, Q, Y or auto"}, status=400)
+
+        series = navstore.nav_range(navstore.load_nav_series(fund.pk), start, end)
+        if rule == 'AUTO':
+            rule = navstore.auto_resample_rule(series, settings.NAV_MAX_POINTS)
+        series = navstore.resample_series(series, rule)
+
+        return Response({
+            'fund_id': fund.pk,
+            'scheme_code': fund.scheme_code,
+            'resample': rule,
+            'dates': navstore.series_dates(series),
+            'nav': series[:, 1].tolist(),
+        })
 
 class DataProviderViewSet(viewsets.ModelViewSet):
     queryset = DataProvider.objects.all()
     serializer_class = DataProviderSerializer
 
+class IngestRunViewSet(viewsets.ReadOnlyModelViewSet):
+    """Timings and counts of past data loads, newest first; filter with ?status= and ?source="""
+    serializer_class = IngestRunSerializer
+
+    def get_queryset(self):
+        queryset = IngestRun.objects.all()
+        for param in ('status', 'source'):
+            value = self.request.query_params.get(param)
+            if value:
+                queryset = queryset.filter(**{param: value})
+        return queryset
+
+def top_funds_params(params):
+    """Validate the top-funds query parameters into (metric, category, limit)"""
+    period = params.get('period', '1Y')
+    metric = params.get('metric') or f"{leaderboards.RETURN_METRIC_PREFIX}{period}"
+    category = params.get('category', '')
+    if not leaderboards.is_ranked_metric(metric):
+        raise ValidationError({"metric": f"Can't rank by {metric}"})
+    try:
+        limit = int(params.get('limit', 10))
+    except ValueError:
+        raise ValidationError({"limit": "limit must be an integer"})
+    if not 1 <= limit <= settings.TOP_FUNDS_MAX_LIMIT:
+        raise ValidationError({"limit": f"limit must be between 1 and {settings.TOP_FUNDS_MAX_LIMIT}"})
+    return metric, category, limit
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@cached_response('top-funds')
 def get_top_performing_funds(request):
-    """Get top performing funds based on returns"""
-    period = request.query_params.get('period', '1Y')
-    category = request.query_params.get('category')
-    limit = int(request.query_params.get('limit', 10))
-    
-    queryset = Fund.objects.all()
-    if category:
-        queryset = queryset.filter(category=category)
-        
-    # Filter and order by returns
-    queryset = queryset.filter(
-        returns_data__period=period
-    ).order_by('-returns_data__value')[:limit]
-    
-    serializer = FundSerializer(queryset, many=True)
-    return Response(serializer.data)
+    """
+    Get top funds from the leaderboards materialized at ingest.
+    Ranks by ?period= returns (default 1Y), or by ?metric= such as sharpe_ratio or expense_ratio.
+    """
+    metric, category, limit = top_funds_params(request.query_params)
+
+    # Empty until the first ingest builds the leaderboards
+    fund_ids = leaderboards.top_fund_ids(metric, category, limit)
+    rows = {
+        row.id: row
+        for row in projection.project_queryset(Fund.objects.filter(pk__in=fund_ids), projection.FUND_FIELDS)
+    }
+    return Response(projection.project_funds(
+        [rows[fund_id] for fund_id in fund_ids if fund_id in rows], projection.FUND_FIELDS
+    ))
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@cached_response('amcs')
 def get_all_amcs(request):
     """Get list of all AMCs"""
     amcs = Fund.objects.values_list('amc', flat=True).distinct().order_by('amc')
     return Response(list(amcs))
 
-@api_view(['GET'])
+@api_view(['POST'])
 @permission_classes([AllowAny])
 def refresh_fund_data(request):
-    """Refresh fund data from external API"""
-    try:
-        # Import locally to avoid circular imports
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        backend_dir = os.path.dirname(current_dir)
-        sys.path.append(backend_dir)
-        
-        from fund_data_service import main as refresh_data
-        refresh_data()
-        return JsonResponse({"status": "success", "message": "Fund data refreshed successfully"})
-    except Exception as e:
-        return JsonResponse({"status": "error", "message": str(e)}, status=500)
+    """Queue a fund data refresh; concurrent requests share the active job"""
+    job, created = enqueue_refresh()
+    data = RefreshJobSerializer(job).data
+    data['created'] = created
+    data['status_url'] = request.build_absolute_uri(reverse('refresh-job', args=[job.pk]))
+    return Response(data, status=202)
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
-def get_advanced_metrics_stats(request):
-    """Get min, max and average values for advanced metrics"""
-    from django.db.models import Min, Max, Avg
-    
-    stats = Fund.objects.aggregate(
-        min_standard_deviation=Min('standard_deviation'),
-        max_standard_deviation=Max('standard_deviation'),
-        avg_standard_deviation=Avg('standard_deviation'),
-        min_sharpe_ratio=Min('sharpe_ratio'),
-        max_sharpe_ratio=Max('sharpe_ratio'),
-        avg_sharpe_ratio=Avg('sharpe_ratio'),
-        min_treynor_ratio=Min('treynor_ratio'),
-        max_treynor_ratio=Max('treynor_ratio'),
-        avg_treynor_ratio=Avg('treynor_ratio'),
-        min_beta=Min('beta'),
-        max_beta=Max('beta'),
-        avg_beta=Avg('beta'),
-        min_alpha=Min('alpha'),
-        max_alpha=Max('alpha'),
-        avg_alpha=Avg('alpha')
+def get_refresh_job(request, job_id):
+    """Get the status and progress of a refresh job"""
+    job = get_object_or_404(RefreshJob, pk=job_id)
+    return Response(RefreshJobSerializer(job).data)
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def get_database_health(request):
+    """Database connectivity, this worker's connection statistics and replica health; 503 when the primary is down"""
+    connected = db_utils.check_database_connection()
+    return Response({
+        'status': 'ok' if connected else 'unavailable',
+        'database': db_utils.get_connection_info(),
+        'connections': db_utils.get_connection_stats(),
+        'replicas': routers.health.status(),
+    }, status=200 if connected else 503)
+
+def get_metrics(request):
+    """Request metrics in the Prometheus text format, for scraping"""
+    token = settings.METRICS_TOKEN
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        response = HttpResponse('Unauthorized', status=401, content_type='text/plain')
+        response.headers['WWW-Authenticate'] = 'Bearer'
+        return response
+    return HttpResponse(metrics.render_metrics(), content_type=metrics.CONTENT_TYPE)
+
+def metric_stats_data(snapshot):
+    """Response data for a MetricSnapshot"""
+    # Flat min/max/avg keys are kept for existing clients, as Decimals like the aggregates they replaced
+    stats = {}
+    for field, summary in snapshot.stats.items():
+        for key in ('min', 'max', 'avg'):
+            stats[f"{key}_{field}"] = Decimal(str(summary[key])) if summary else None
+    stats.update({
+        'category': snapshot.category or None,
+        'sub_category': snapshot.sub_category or None,
+        'fund_count': snapshot.fund_count,
+        'metrics': snapshot.stats,
+    })
+    return stats
+
+def empty_metric_snapshot(category='', sub_category=''):
+    """An unsaved MetricSnapshot with no funds, served before the first ingest builds them"""
+    return MetricSnapshot(
+        category=category, sub_category=sub_category, fund_count=0,
+        stats={field: None for field in SUMMARY_FIELDS},
     )
-    
-    return Response(stats)
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@cached_response('metrics-stats')
+def get_advanced_metrics_stats(request):
+    """Get precomputed statistics for advanced metrics, optionally for one category"""
+    category = request.query_params.get('category', '')
+    sub_category = request.query_params.get('sub_category', '')
+
+    snapshot = MetricSnapshot.objects.filter(
+        category=category, sub_category=sub_category
+    ).first()
+    if snapshot is None:
+        if not MetricSnapshot.objects.exists():
+            # Nothing ingested yet
+            return Response(metric_stats_data(empty_metric_snapshot(category, sub_category)))
+        return Response({"detail": "No statistics for this category"}, status=404)
+
+    return Response(metric_stats_data(snapshot))
+
+# Largest number of funds one calculator request may cover
+MAX_CALCULATOR_FUNDS = 100
+
+def _calculator_funds(request):
+    """Funds named by the comma-separated ids parameter, in request order"""
+    try:
+        ids = [int(value) for value in request.query_params.get('ids', '').split(',') if value]
+    except ValueError:
+        raise ValidationError({"ids": "ids must be a comma-separated list of fund ids"})
+    if not ids:
+        raise ValidationError({"ids": "At least one fund id is required"})
+    if len(ids) > MAX_CALCULATOR_FUNDS:
+        raise ValidationError({"ids": f"At most {MAX_CALCULATOR_FUNDS} funds per request"})
+    codes = dict(Fund.objects.filter(pk__in=ids).values_list('id', 'scheme_code'))
+    return [(fund_id, codes[fund_id]) for fund_id in dict.fromkeys(ids) if fund_id in codes]
+
+def _date_range(request):
+    try:
+        start = navstore.parse_date(request.query_params.get('from'))
+        end = navstore.parse_date(request.query_params.get('to'))
+    except ValueError:
+        raise ValidationError({"detail": "from and to must be YYYY-MM-DD dates"})
+    return start, end
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@conditional_response('rolling-returns')
+def get_rolling_returns(request):
+    """Rolling return distribution for one or more funds, e.g. ?ids=1,2&window=3Y"""
+    try:
+        window_days = calculators.parse_window(request.query_params.get('window', '1Y'))
+    except ValueError as e:
+        raise ValidationError({"window": str(e)})
+    start, end = _date_range(request)
+
+    results = []
+    for fund_id, scheme_code in _calculator_funds(request):
+        series = navstore.nav_range(navstore.load_log_series(fund_id), start, end)
+        _, values = calculators.rolling_returns(series, window_days)
+        results.append({
+            'fund_id': fund_id,
+            'scheme_code': scheme_code,
+            **calculators.summarize_returns(values),
+        })
+    return Response({'window_days': window_days, 'results': results})
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@conditional_response('sip-returns')
+def get_sip_returns(request):
+    """Monthly SIP outcome and XIRR for one or more funds, e.g. ?ids=1,2&amount=5000&from=2021-01-01"""
+    try:
+        amount = float(request.query_params.get('amount', 1000))
+    except ValueError:
+        amount = 0
+    if not math.isfinite(amount) or amount <= 0:
+        raise ValidationError({"amount": "amount must be a positive number"})
+    start, end = _date_range(request)
+    if start is None:
+        raise ValidationError({"from": "from is required"})
+    end = end or date.today()
+
+    results = []
+    for fund_id, scheme_code in _calculator_funds(request):
+        outcome = calculators.simulate_sip(navstore.load_log_series(fund_id), amount, start, end)
+        results.append({
+            'fund_id': fund_id,
+            'scheme_code': scheme_code,
+            **(outcome or {'installments': 0}),
+        })
+    return Response({'amount': amount, 'from': start, 'to': end, 'results': results})
@@ -158,10 +158,9 @@ export async function compareFunds(fundIds: string[]): Promise<FundData[]> {
   try {
     // First try to fetch from the backend API
     try {
-      // Build a query with all the fund IDs
-      const queryString = fundIds.map(id => `id=${id}`).join('&');
+      const queryString = `ids=${fundIds.map(encodeURIComponent).join(',')}`;
       console.log(`Attempting to compare funds from backend API`);
-      const response = await fetch(`${API_BASE_URL}/funds/?${queryString}`);
+      const response = await fetch(`${API_BASE_URL}/funds/compare/?${queryString}`);
       
       if (response.ok) {
         const data = await response.json();